@@ -1,8 +1,13 @@
 
 import os
-import google.generativeai as genai
+import re
+import hashlib
+import threading
+import time
+import perf
 from dotenv import load_dotenv
-from datetime import datetime
+from datetime import datetime, date
+from database import get_cached_briefing, save_briefing
 
 load_dotenv()
 api_key = os.getenv("GOOGLE_API_KEY")
@@ -14,13 +19,51 @@ if not api_key:
     except ImportError:
         raise ValueError("GOOGLE_API_KEY tidak ditemukan. Pastikan file .env Anda sudah benar.")
 
-genai.configure(api_key=api_key)
+MODEL_NAME = 'gemini-1.5-flash'
+# Naikkan setiap kali isi prompt diubah agar cache briefing lama tidak dipakai lagi
+PROMPT_VERSION = "1"
+BRIEFING_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", "200"))
+BRIEFING_CACHE_MAX_AGE_DAYS = int(os.getenv("AI_CACHE_MAX_AGE_DAYS", "30"))
 
-def dapatkan_analisis_ai(topik_analisis: str) -> str:
-    """
-    Mengirim prompt ke model AI Gemini dan mengembalikan responsnya sebagai teks.
-    """
-    
+_model = None
+_model_lock = threading.Lock()
+
+def get_model():
+    """Client model Gemini yang dipakai ulang di seluruh proses (SDK diimpor & dikonfigurasi saat pertama dipakai)."""
+    global _model
+    with _model_lock:
+        if _model is None:
+            import google.generativeai as genai
+            genai.configure(api_key=api_key)
+            _model = genai.GenerativeModel(MODEL_NAME)
+        return _model
+
+def set_model(model):
+    """Ganti client model (mis. stub untuk pengujian); None membuat ulang client asli saat dibutuhkan."""
+    global _model
+    with _model_lock: _model = model
+
+def normalize_topic(topik_analisis: str) -> str:
+    return re.sub(r"\s+", " ", topik_analisis).strip(" \t\n.?!").lower()
+
+def briefing_cache_key(topik_analisis: str, tanggal: date = None) -> str:
+    tanggal = tanggal or date.today()
+    return hashlib.sha256(f"{PROMPT_VERSION}|{tanggal.isoformat()}|{normalize_topic(topik_analisis)}".encode()).hexdigest()
+
+def _simpan_cache(topik_analisis, teks):
+    try:
+        save_briefing(briefing_cache_key(topik_analisis), normalize_topic(topik_analisis), date.today().isoformat(), PROMPT_VERSION, teks,
+                      BRIEFING_CACHE_MAX_ENTRIES, BRIEFING_CACHE_MAX_AGE_DAYS)
+    except Exception:
+        pass  # cache hanya optimasi; briefing tetap dikembalikan
+
+def _ambil_cache(topik_analisis):
+    try:
+        return get_cached_briefing(briefing_cache_key(topik_analisis))
+    except Exception:
+        return None
+
+def _buat_prompt(topik_analisis: str) -> str:
     current_date = datetime.now().strftime('%d %B %Y')
 
     prompt_final = f"""
@@ -46,10 +89,43 @@ def dapatkan_analisis_ai(topik_analisis: str) -> str:
     
     PENTING: Jangan gunakan placeholder. Berikan jawaban seolah-olah Anda memiliki akses ke data pasar terkini.
     """
+    return prompt_final
 
+def dapatkan_analisis_ai(topik_analisis: str) -> str:
+    """
+    Mengirim prompt ke model AI Gemini dan mengembalikan responsnya sebagai teks.
+    Topik yang sama pada hari yang sama dilayani dari cache briefing di database.
+    """
+    cached = _ambil_cache(topik_analisis)
+    perf.count("ai_cache.hits" if cached is not None else "ai_cache.misses")
+    if cached is not None: return cached
+    try:
+        with perf.span("ai.generate"): teks = get_model().generate_content(_buat_prompt(topik_analisis)).text
+    except Exception as e:
+        return f"Terjadi kesalahan saat menghubungi AI: {e}"
+    _simpan_cache(topik_analisis, teks)
+    return teks
+
+def stream_analisis_ai(topik_analisis: str):
+    """
+    Versi streaming dari dapatkan_analisis_ai: menghasilkan potongan teks begitu diterima dari model,
+    sehingga bisa dirender bertahap (mis. dengan st.write_stream). Respons lengkap disimpan ke cache.
+    """
+    cached = _ambil_cache(topik_analisis)
+    perf.count("ai_cache.hits" if cached is not None else "ai_cache.misses")
+    if cached is not None:
+        yield cached
+        return
+    potongan, mulai = [], time.perf_counter()
     try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        response = model.generate_content(prompt_final)
-        return response.text
+        for chunk in get_model().generate_content(_buat_prompt(topik_analisis), stream=True):
+            if chunk.text:
+                if not potongan: perf.record("ai.first_chunk", mulai, time.perf_counter())
+                potongan.append(chunk.text)
+                yield chunk.text
     except Exception as e:
-        return f"Terjadi kesalahan saat menghubungi AI: {e}"
\ No newline at end of file
+        perf.record("ai.stream", mulai, time.perf_counter(), error=type(e).__name__)
+        yield f"\n\nTerjadi kesalahan saat menghubungi AI: {e}"
+        return
+    perf.record("ai.stream", mulai, time.perf_counter(), chunks=len(potongan))
+    _simpan_cache(topik_analisis, "".join(potongan))
\ No newline at end of file
@@ -0,0 +1,150 @@
+import csv
+import json
+import asyncio
+import threading
+from bisect import bisect_left, bisect_right, insort
+import websockets
+from database import get_active_price_alerts, mark_alerts_triggered
+
+BINANCE_STREAM_URL = "wss://stream.binance.com:9443/stream?streams="
+# Selain saat ada notifikasi perubahan, daftar alert dimuat ulang dari database setiap interval ini (detik)
+RELOAD_INTERVAL = 60
+
+class AlertBook:
+    """Threshold per aset dalam list terurut; setiap tick hanya menyentuh alert yang terlewati (O(log n + k))."""
+
+    def __init__(self):
+        self._above = {}  # aset -> [(harga, id)] terurut, terpicu saat harga > threshold
+        self._below = {}  # aset -> [(harga, id)] terurut, terpicu saat harga < threshold
+
+    def add(self, alert_id, asset, condition, price):
+        book = self._above if condition == '>' else self._below
+        insort(book.setdefault(asset, []), (price, alert_id))
+
+    def load(self, alerts_df):
+        self._above, self._below = {}, {}
+        for alert_id, asset, condition, price in alerts_df[['id', 'asset', 'condition', 'price']].itertuples(index=False):
+            self.add(int(alert_id), asset, condition, float(price))
+
+    def assets(self):
+        return sorted(a for a in set(self._above) | set(self._below) if self._above.get(a) or self._below.get(a))
+
+    def __len__(self):
+        return sum(map(len, self._above.values())) + sum(map(len, self._below.values()))
+
+    def on_price(self, asset, price):
+        """Kembalikan id alert yang terpicu oleh harga ini dan keluarkan dari buku."""
+        fired = []
+        above = self._above.get(asset)
+        if above:
+            cut = bisect_left(above, (price,))
+            fired += [alert_id for _, alert_id in above[:cut]]; del above[:cut]
+        below = self._below.get(asset)
+        if below:
+            cut = bisect_right(below, (price, float('inf')))
+            fired += [alert_id for _, alert_id in below[cut:]]; del below[cut:]
+        return fired
+
+# --- SUMBER HARGA (async iterator yang menghasilkan (aset, harga_usd)) ---
+async def binance_stream(assets):
+    """Harga live dari miniTicker Binance (pasangan <ASET>USDT)."""
+    pairs = {f"{a.lower()}usdt": a for a in assets if a.upper() != "USDT"}
+    if not pairs: return
+    async with websockets.connect(BINANCE_STREAM_URL + "/".join(f"{p}@miniTicker" for p in pairs)) as ws:
+        async for message in ws:
+            data = json.loads(message).get("data", {})
+            asset = pairs.get(str(data.get("s", "")).lower())
+            if asset: yield asset, float(data["c"])
+
+def replay_stream(source, delay=0.0):
+    """Feed replay untuk pengujian: iterable (aset, harga) atau path CSV berkolom asset,price."""
+    async def stream(assets):
+        rows = source
+        if isinstance(source, str):
+            with open(source, newline="") as f: rows = [(r["asset"], float(r["price"])) for r in csv.DictReader(f)]
+        for asset, price in rows:
+            if asset in assets: yield asset, price
+            if delay: await asyncio.sleep(delay)
+    return stream
+
+class AlertEvaluator:
+    """Mengevaluasi alert di thread background terhadap stream harga dan mencatat yang terpicu ke database."""
+
+    def __init__(self, stream_factory=binance_stream, reconnect_delay=5.0):
+        self.stream_factory, self.reconnect_delay = stream_factory, reconnect_delay
+        self.book = AlertBook()
+        self.last_prices = {}
+        self._changed = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def notify_changed(self):
+        """Dipanggil setelah alert ditambah/dihapus agar buku dimuat ulang dan stream disubscribe ulang."""
+        self._changed.set()
+
+    def start(self):
+        if self._thread and self._thread.is_alive(): return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._run()), name="alert_evaluator", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stopped.set(); self._changed.set()
+        if self._thread: self._thread.join(timeout)
+
+    def process_tick(self, asset, price):
+        self.last_prices[asset] = price
+        fired = self.book.on_price(asset, price)
+        if fired: mark_alerts_triggered([(alert_id, price) for alert_id in fired])
+        return fired
+
+    async def _run(self):
+        while not self._stopped.is_set():
+            self._changed.clear()
+            try:
+                self.book.load(await asyncio.to_thread(get_active_price_alerts))
+                assets = self.book.assets()
+                if assets: await self._consume(self.stream_factory(assets))
+                else: await self._wait(self._changed, RELOAD_INTERVAL)
+            except Exception:
+                await self._wait(self._stopped, self.reconnect_delay)
+
+    @staticmethod
+    async def _wait(event, timeout, poll=0.2):
+        """Tunggu threading.Event tanpa memakai thread executor (yang tidak tersedia saat interpreter shutdown)."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while not event.is_set() and loop.time() < deadline: await asyncio.sleep(poll)
+
+    async def _consume(self, stream):
+        """Konsumsi stream sampai daftar alert berubah, interval reload lewat, atau stream habis."""
+        loop, ticks, pending = asyncio.get_running_loop(), stream.__aiter__(), None
+        deadline = loop.time() + RELOAD_INTERVAL
+        try:
+            while not self._changed.is_set() and loop.time() < deadline:
+                # Task __anext__ tidak dibatalkan saat timeout, supaya generator stream tidak ikut tertutup
+                pending = pending or asyncio.ensure_future(ticks.__anext__())
+                done, _ = await asyncio.wait({pending}, timeout=1.0)
+                if not done: continue
+                task, pending = pending, None
+                try: asset, price = task.result()
+                except StopAsyncIteration:
+                    await self._wait(self._changed, deadline - loop.time()); return
+                if self.process_tick(asset, price) and not len(self.book): return
+        finally:
+            if pending:
+                pending.cancel()
+                await asyncio.gather(pending, return_exceptions=True)
+            await ticks.aclose()
+
+_evaluator = None
+_evaluator_lock = threading.Lock()
+
+def get_evaluator(stream_factory=None):
+    """Evaluator tunggal per proses, dijalankan saat pertama kali diminta."""
+    global _evaluator
+    with _evaluator_lock:  # init_app (thread background) dan halaman dashboard bisa memanggil bersamaan
+        if _evaluator is None:
+            _evaluator = AlertEvaluator(stream_factory or binance_stream)
+            _evaluator.start()
+        return _evaluator
@@ -1,72 +1,116 @@
 import streamlit as st
 import nest_asyncio
 nest_asyncio.apply() 
+import threading
 import pandas as pd
-import yfinance as yf
-from database import init_db, add_transaction, get_all_transactions, get_portfolio_summary, get_total_deposits, add_portfolio_snapshot, get_portfolio_history, add_journal_entry, get_journal_entries, add_watched_wallet, get_watched_wallets, remove_watched_wallet
-from ai_module import dapatkan_analisis_ai
-from market_data import get_fear_and_greed_index, get_btc_dominance, get_usd_to_idr_rate
-from whale_watcher import get_latest_transactions
+from datetime import date
+import perf
+from database import init_db, add_transaction, get_transactions_page, get_journal_page, get_dashboard_snapshot, add_portfolio_snapshot, add_journal_entry, add_watched_wallet, get_watched_wallets, remove_watched_wallet, add_price_alert, get_active_price_alerts, remove_price_alert, pop_triggered_alerts, get_sync_status
+# Modul berat (yfinance, google-generativeai, aiohttp, websockets) diimpor di dalam fungsi halaman yang
+# membutuhkannya, supaya halaman Jurnal dan cold start tidak ikut membayar biaya impornya.
 
 # --- FUNGSI-FUNGSI ---
+@st.cache_resource
+def read_css(file_name):
+    with open(file_name) as f: return f.read()
+
 def local_css(file_name):
-    with open(file_name) as f: st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
-
-def diagnose_market_regime(war_mode, ticker="BTC-USD"):
-    try:
-        data = yf.Ticker(ticker).history(period="250d"); sma_200 = data['Close'].rolling(window=200).mean().iloc[-1]; current_price = data['Close'].iloc[-1]
-        if current_price > sma_200:
-            reason = f"Pasukan utama (${current_price:,.2f}) memimpin di depan garis logistik (${sma_200:,.2f})." if war_mode else f"Harga BTC (${current_price:,.2f}) di atas SMA 200 (${sma_200:,.2f})."
-            regime = "Cerah (Risk-On)" if war_mode else "Bullish (Risk-On)"
-            return regime, reason
-        else:
-            reason = f"Pasukan utama (${current_price:,.2f}) tertinggal dari garis logistik (${sma_200:,.2f})." if war_mode else f"Harga BTC (${current_price:,.2f}) di bawah SMA 200 (${sma_200:,.2f})."
-            regime = "Badai (Risk-Off)" if war_mode else "Bearish (Risk-Off)"
-            return regime, reason
-    except: return "Error", "Gagal menganalisis."
+    st.markdown(f"<style>{read_css(file_name)}</style>", unsafe_allow_html=True)
+
+@st.cache_resource
+def init_app():
+    """Inisialisasi sekali per proses: skema database dan evaluator alert (diimpor & dijalankan di background)."""
+    init_db()
+    threading.Thread(target=lambda: __import__("alert_engine").get_evaluator(), name="alert_engine_start", daemon=True).start()
+    return True
+
+def freshness_label(source):
+    if source["age"] is None: return "Belum tersedia"
+    return f"Diperbarui {source['age'] / 60:.0f} menit lalu" + (" (basi, sedang disegarkan)" if source["stale"] else "")
 
 def calculate_momentum_allocation(assets, days=30):
-    tickers = [f"{a}-USD" for a in assets]; data = yf.download(tickers, period=f"{days+1}d")['Close']
+    from ohlcv_store import get_closes
+    tickers = [f"{a}-USD" for a in assets]; data = get_closes(tickers, days + 1)
     if data.empty: return None
     returns = data.pct_change(days).iloc[-1].clip(lower=0)
     if returns.sum() == 0: return {a: 1/len(assets) for a in assets}
     weights = returns / returns.sum(); return {k.replace('-USD', ''): v for k, v in weights.to_dict().items()}
 
 def calculate_risk_based_allocation(assets, days=30):
-    tickers = [f"{a}-USD" for a in assets]; data = yf.download(tickers, period=f"{days}d")['Close']
+    from ohlcv_store import get_closes
+    tickers = [f"{a}-USD" for a in assets]; data = get_closes(tickers, days)
     if data.empty: return None
     returns = data.pct_change().dropna(); volatility = returns.std(); inv_vol = 1 / volatility
     weights = inv_vol / inv_vol.sum(); return {k.replace('-USD', ''): v for k, v in weights.to_dict().items()}
 
+LEDGER_ASSETS = ["BTC", "ETH", "USDT", "SOL", "BNB"]
+
+def ledger_filters(key):
+    """Widget filter aset/tipe/rentang tanggal; hasilnya dipakai sebagai kwargs get_transactions_page / get_journal_page."""
+    c1, c2, c3 = st.columns(3)
+    asset = c1.selectbox("Aset", ["Semua"] + LEDGER_ASSETS, key=f"{key}_asset")
+    tr_type = c2.selectbox("Tipe", ["Semua", "BUY", "SELL", "DEPOSIT"], key=f"{key}_type")
+    rentang = c3.date_input("Rentang tanggal", value=(), key=f"{key}_dates")
+    return {"asset": None if asset == "Semua" else asset, "tr_type": None if tr_type == "Semua" else tr_type,
+            "start": rentang[0] if len(rentang) > 0 else None, "end": rentang[1] if len(rentang) > 1 else None}
+
+def paginate(key, fetch, limit, **filters):
+    """Halaman keyset: kursor tiap halaman yang sudah dibuka disimpan di session_state; filter berubah -> kembali ke halaman 1."""
+    state = st.session_state.setdefault(key, {"filters": None, "cursors": [None]})
+    if state["filters"] != filters: state.update(filters=filters, cursors=[None])
+    df, next_cursor = fetch(limit=limit, cursor=state["cursors"][-1], **filters)
+    c1, c2, c3 = st.columns([0.3, 0.4, 0.3])
+    if len(state["cursors"]) > 1 and c1.button("← Sebelumnya", key=f"{key}_prev"): state["cursors"].pop(); st.rerun()
+    c2.caption(f"Halaman {len(state['cursors'])}")
+    if next_cursor and c3.button("Berikutnya →", key=f"{key}_next"): state["cursors"].append(next_cursor); st.rerun()
+    return df
+
+def display_perf_panel(trace):
+    """Waterfall span rerun ini di sidebar (span dari thread lain diberi warna berbeda)."""
+    data = trace.to_dict()
+    with st.sidebar.expander(f"⏱️ Rerun ini: {data['duration_ms']:.0f} ms", expanded=True):
+        spans = pd.DataFrame(data["spans"])
+        if spans.empty: st.caption("Tidak ada span tercatat."); return
+        spans["label"] = [f"{i:02d} {'· ' * d}{n}" for i, (d, n) in enumerate(zip(spans["depth"], spans["name"]))]
+        spans["end_ms"] = spans["start_ms"] + spans["duration_ms"]
+        spans["detail"] = [(a.get("sql") or ", ".join(f"{k}={v}" for k, v in a.items())) if isinstance(a, dict) else "" for a in spans.get("attrs", [None] * len(spans))]
+        st.vega_lite_chart(spans[["label", "start_ms", "end_ms", "duration_ms", "thread", "detail"]], {
+            "mark": "bar",
+            "encoding": {
+                "y": {"field": "label", "type": "nominal", "sort": None, "title": None},
+                "x": {"field": "start_ms", "type": "quantitative", "title": "ms sejak awal rerun"}, "x2": {"field": "end_ms"},
+                "color": {"field": "thread", "type": "nominal", "legend": None},
+                "tooltip": [{"field": "label"}, {"field": "duration_ms", "format": ".1f"}, {"field": "thread"}, {"field": "detail"}],
+            },
+        }, width="stretch")
+        st.dataframe(pd.DataFrame(perf.summarize(trace)).style.format({"total_ms": "{:.1f}", "max_ms": "{:.1f}"}), hide_index=True, width="stretch")
+        if data["counters"]: st.caption(" · ".join(f"{k}: {v}" for k, v in sorted(data["counters"].items()) if not k.endswith(".calls")))
+
 # --- FUNGSI HALAMAN ---
+@perf.traced("page.dashboard")
 def display_dashboard(war_mode, currency_symbol, currency_format, currency_rate):
+    from market_data import get_market_snapshot, format_market_regime
+    from price_service import get_asset_prices
     TEXT_MAP = { "title": "Pusat Komando Digital" if war_mode else "Pandu Terminal", "subtitle": "*Perang Informasi di Medan Perang Finansial.*" if war_mode else "*Clarity in Chaos.*", "market_health_header": "📡 Laporan Intelijen Medan Perang" if war_mode else "🩺 Status Kesehatan Pasar", "fng_label": "Moral Pasukan Musuh" if war_mode else "Fear & Greed Index", "dom_label": "Kontrol Teritori Utama" if war_mode else "BTC Dominance", "regime_label": "Kondisi Cuaca Perang" if war_mode else "Musim Pasar (Regime)", "portfolio_header": "🎖️ Status Kekuatan Militer" if war_mode else "📈 Ringkasan Portofolio", "portfolio_value": "Total Kekuatan Tempur" if war_mode else "Nilai Portofolio", "capital_value": "Total Sumber Daya" if war_mode else "Modal Investasi", "pl_value": "Wilayah Dikuasai/Hilang" if war_mode else "Profit/Loss", "asset_details": "Rincian Unit Pasukan" if war_mode else "Rincian Aset", "asset_col": "Unit Pasukan" if war_mode else "Aset", "qty_col": "Kekuatan" if war_mode else "Jumlah", "value_col": f"Nilai ({currency_symbol})", "alloc_col": "Dispersi Pasukan" if war_mode else "Alokasi", "growth_chart": "Grafik Kekuatan Tempur" if war_mode else "Grafik Pertumbuhan Portofolio", "allocation_module": "🗺️ Meja Perencanaan Strategis" if war_mode else "🧠 Modul Alokasi Aset Strategis", "new_funds": f"Jumlah Amunisi Baru ({currency_symbol}):" if war_mode else f"Dana tambahan ({currency_symbol}):", "strategy_select": "Pilih Doktrin Perang:" if war_mode else "Pilih Strategi Alokasi:", "strat_expert": "🎖️ Sang Jenderal AI" if war_mode else "🤖 Alokasi Cerdas Otomatis", "strat_shield": "🛡️ Formasi Bertahan" if war_mode else "🛡️ Berbasis Risiko", "strat_prop": "📊 Pergerakan Serentak" if war_mode else "📈 Proporsional", "strat_custom": "✍️ Rencana Sendiri" if war_mode else "✍️ Kustom", "reco_button": "Gelar Rencana Perang" if war_mode else "Hitung Rekomendasi", "reco_header": "✅ Perintah Operasi" if war_mode else "✅ Hasil Rekomendasi", "ai_header": "🤖 Penasihat AI Jenderal" if war_mode else "🤖 Asisten Riset AI", "ai_topic": "Minta analisis intelijen tentang:" if war_mode else "Topik riset:", "ai_button": "Mulai Analisis" if war_mode else "Hasilkan Analisis", "tx_expander": "Logistik & Arsip Pertempuran" if war_mode else "Catat Transaksi / Lihat Riwayat", "tx_form": "Catat Manuver Pasukan" if war_mode else "Catat Transaksi Baru", "tx_history": "Arsip Pertempuran" if war_mode else "Riwayat Transaksi",}
     st.title(TEXT_MAP["title"]); st.write(TEXT_MAP["subtitle"])
     st.markdown("---"); st.header(TEXT_MAP["market_health_header"])
-    fng, btc_dom, (regime, reason) = get_fear_and_greed_index(), get_btc_dominance(), diagnose_market_regime(war_mode)
-    c1,c2,c3=st.columns(3); c1.metric(TEXT_MAP["fng_label"], fng); c2.metric(TEXT_MAP["dom_label"], btc_dom); c3.metric(TEXT_MAP["regime_label"], regime, help=reason)
+    market = get_market_snapshot()
+    fng, btc_dom = market["fng"]["value"] or "N/A", market["btc_dominance"]["value"] or "N/A"
+    regime, reason = format_market_regime(*market["regime"]["value"], war_mode) if market["regime"]["value"] else ("Error", "Gagal menganalisis.")
+    c1,c2,c3=st.columns(3); c1.metric(TEXT_MAP["fng_label"], fng, help=freshness_label(market["fng"])); c2.metric(TEXT_MAP["dom_label"], btc_dom, help=freshness_label(market["btc_dominance"])); c3.metric(TEXT_MAP["regime_label"], regime, help=f"{reason}\n\n{freshness_label(market['regime'])}")
     st.markdown("---"); st.header(TEXT_MAP["portfolio_header"])
-    portfolio_df, total_deposits_usd, total_portfolio_value_usd, asset_values = get_portfolio_summary(), get_total_deposits(), 0.0, {}
+    (portfolio_df, total_deposits_usd, history_df), total_portfolio_value_usd, asset_values = get_dashboard_snapshot(), 0.0, {}
+    live_prices = get_asset_prices(portfolio_df['asset'].tolist()) if not portfolio_df.empty else {}
     if not portfolio_df.empty:
-        assets, tickers = portfolio_df['asset'].tolist(), [f"{a}-USD" for a in portfolio_df['asset'].tolist()]
-        try:
-            live_prices = yf.Tickers(tickers)
-            for _, row in portfolio_df.iterrows():
-                asset, quantity = row['asset'], row['total_quantity']
-                price = live_prices.tickers[f'{asset}-USD'].history(period='1d')['Close'].iloc[-1]
-                asset_values[asset] = {'quantity': quantity, 'value_usd': quantity * price}; total_portfolio_value_usd += asset_values[asset]['value_usd']
-        except Exception as e:
-            st.error(f"Gagal mengambil data harga saat ini. Error: {e}")
-    if st.session_state.price_alert:
-        alert = st.session_state.price_alert; alert_price_display = alert['price'] * currency_rate
-        currency_format_alert = "Rp {:,.0f}" if currency_rate > 1 else "${:,.2f}"
-        st.sidebar.info(f"Aktif: {alert['asset']} {alert['condition']} {currency_format_alert.format(alert_price_display)}")
-        try:
-            live_price_usd = yf.Ticker(f"{alert['asset']}-USD").history(period='1d')['Close'].iloc[-1]
-            if (alert['condition'] == '>' and live_price_usd > alert['price']) or (alert['condition'] == '<' and live_price_usd < alert['price']):
-                st.toast(f"🔔 ALERT: {alert['asset']} {alert['condition']} {currency_format_alert.format(alert['price']*currency_rate)}!", icon='💰'); st.session_state.price_alert = None
-        except: st.sidebar.warning(f"Gagal cek harga {alert['asset']}.")
-    if total_portfolio_value_usd > 0: add_portfolio_snapshot(total_portfolio_value_usd)
+        missing = [a for a in portfolio_df['asset'] if a not in live_prices]
+        if missing: st.error(f"Gagal mengambil data harga saat ini untuk: {', '.join(missing)}")
+        for asset, quantity in zip(portfolio_df['asset'], portfolio_df['total_quantity']):
+            if asset in live_prices:
+                asset_values[asset] = {'quantity': quantity, 'value_usd': quantity * live_prices[asset]}; total_portfolio_value_usd += asset_values[asset]['value_usd']
+    if total_portfolio_value_usd > 0:
+        add_portfolio_snapshot(total_portfolio_value_usd); today = pd.Timestamp(date.today())
+        if history_df.empty: history_df = pd.DataFrame({'total_value_usd': [total_portfolio_value_usd]}, index=pd.DatetimeIndex([today], name='snapshot_date'))
+        elif today not in history_df.index: history_df.loc[today, 'total_value_usd'] = total_portfolio_value_usd
     total_pl_usd, pl_percent = total_portfolio_value_usd - total_deposits_usd, (total_portfolio_value_usd - total_deposits_usd) / total_deposits_usd * 100 if total_deposits_usd > 0 else 0
     c1, c2, c3 = st.columns(3); c1.metric(TEXT_MAP["portfolio_value"], currency_format.format(total_portfolio_value_usd * currency_rate)); c2.metric(TEXT_MAP["capital_value"], currency_format.format(total_deposits_usd * currency_rate)); c3.metric(TEXT_MAP["pl_value"], currency_format.format(total_pl_usd * currency_rate), f"{pl_percent:.2f}%")
     asset_df_display = pd.DataFrame([{'Aset': k, 'Jumlah': v['quantity'], 'Nilai': v['value_usd'] * currency_rate} for k,v in asset_values.items()])
@@ -74,9 +118,17 @@ def display_dashboard(war_mode, currency_symbol, currency_format, currency_rate)
         asset_df_display.columns = [TEXT_MAP['asset_col'], TEXT_MAP['qty_col'], TEXT_MAP['value_col']]
         asset_df_display[TEXT_MAP['alloc_col']] = (asset_df_display[TEXT_MAP['value_col']] / (total_portfolio_value_usd * currency_rate) * 100) if total_portfolio_value_usd > 0 else 0
         st.subheader(TEXT_MAP["asset_details"]); st.dataframe(asset_df_display.style.format({TEXT_MAP['value_col']: currency_format, TEXT_MAP['alloc_col']: '{:.2f}%'}), width='stretch')
-    st.subheader(TEXT_MAP["growth_chart"]); history_df = get_portfolio_history()
-    if history_df.empty: st.info("Buka aplikasi setiap hari untuk membangun grafik.")
+    st.subheader(TEXT_MAP["growth_chart"])
+    if history_df.empty: st.info("Buka aplikasi setiap hari untuk membangun grafik, atau bangun ulang dari riwayat transaksi.")
     else: st.line_chart(history_df['total_value_usd'] * currency_rate)
+    if st.button("🔄 Bangun Ulang Grafik dari Riwayat Transaksi"):
+        from portfolio_backfill import backfill_portfolio_history
+        with st.spinner("Menghitung nilai portofolio harian..."): st.session_state["backfill_result"] = backfill_portfolio_history()
+        st.rerun()  # pesan hasil ditampilkan di run berikutnya (st.rerun membuang elemen yang sudah digambar)
+    if (result := st.session_state.pop("backfill_result", None)) is not None:
+        from portfolio_backfill import format_price_gaps
+        if result["price_gaps"]: st.warning(f"{result['skipped_days']} hari dilewati karena harga belum ada: {format_price_gaps(result['price_gaps'])}")
+        st.success(f"{result['days']} hari riwayat diperbarui.")
     st.markdown("---"); st.header(TEXT_MAP["allocation_module"])
     new_funds = st.number_input(TEXT_MAP["new_funds"], 0.0, step=100.0, format="%.2f")
     strategy_options = [TEXT_MAP["strat_expert"], TEXT_MAP["strat_shield"], TEXT_MAP["strat_prop"], TEXT_MAP["strat_custom"]]
@@ -90,7 +142,7 @@ def display_dashboard(war_mode, currency_symbol, currency_format, currency_rate)
             recos, assets_to_analyze = [], ['BTC', 'ETH', 'SOL']; weights = None; new_funds_usd = new_funds / currency_rate
             if strategy == TEXT_MAP["strat_expert"]:
                 with st.spinner("Mendiagnosis medan perang..."):
-                    regime, reason = diagnose_market_regime(war_mode); st.info(f"**Status Medan Perang: {regime}**\n\n*{reason}*")
+                    st.info(f"**Status Medan Perang: {regime}**\n\n*{reason}*")
                     if "Cerah" in regime or "Bullish" in regime: st.write("✅ **Doktrin Aktif: Serangan Cepat (Momentum)**"); weights = calculate_momentum_allocation(assets_to_analyze)
                     else: st.write("🛡️ **Doktrin Aktif: Formasi Bertahan (Risiko)**"); weights = calculate_risk_based_allocation(assets_to_analyze)
             elif strategy == TEXT_MAP["strat_shield"]:
@@ -109,7 +161,8 @@ def display_dashboard(war_mode, currency_symbol, currency_format, currency_rate)
     ai_topic = st.text_input(TEXT_MAP["ai_topic"], "Prospek Bitcoin (BTC) minggu depan")
     if st.button(TEXT_MAP["ai_button"]):
         if ai_topic:
-            with st.spinner("Memanggil intelijen..."): st.markdown(dapatkan_analisis_ai(ai_topic))
+            from ai_module import stream_analisis_ai
+            st.write_stream(stream_analisis_ai(ai_topic))
         else: st.warning("Masukkan topik intelijen.")
     st.markdown("---")
     with st.expander(TEXT_MAP["tx_expander"]):
@@ -120,30 +173,45 @@ def display_dashboard(war_mode, currency_symbol, currency_format, currency_rate)
             if st.button("Simpan Laporan"):
                 if quantity > 0: price_in_usd = price_input / currency_rate; add_transaction(asset, tr_type, quantity, price_in_usd); st.success("Laporan tersimpan!"); st.rerun()
                 else: st.warning("Kekuatan harus > 0.")
+            st.markdown("---"); uploaded = st.file_uploader("Impor ekspor bursa (CSV/JSON)", type=["csv", "json", "jsonl"], key="import_file")
+            import_currency = st.selectbox("Mata uang harga jika tidak ada di file", ["USD", "IDR"], key="import_currency")
+            if uploaded and st.button("Impor Transaksi"):
+                from transaction_import import import_transactions
+                bar = st.progress(0.0, text="Mengimpor...")
+                try: result = import_transactions(uploaded, import_currency, progress=lambda s: bar.progress(s["progress"], text=f"{s['rows_read']:,} baris · {s['rows_per_s']:,.0f} baris/detik"))
+                except ValueError as e: st.error(f"Impor gagal: {e}")
+                else:
+                    st.success(f"{result['inserted']:,} transaksi baru, {result['duplicates']:,} duplikat dilewati, {result['rejected']:,} ditolak ({result['elapsed_s']:.1f} detik).")
+                    if result["rejected_reasons"]: st.caption(" · ".join(f"{why}: {n:,}" for why, n in result["rejected_reasons"].items()))
         with c2:
-            st.subheader(TEXT_MAP["tx_history"]); all_data = get_all_transactions()
-            if all_data.empty: st.info("Arsip kosong.")
-            else: st.dataframe(all_data, width='stretch')
+            st.subheader(TEXT_MAP["tx_history"]); history_page = paginate("tx_history_page", get_transactions_page, 50, **ledger_filters("tx_history"))
+            if history_page.empty: st.info("Arsip kosong.")
+            else: st.dataframe(history_page, width='stretch', hide_index=True)
 
+@perf.traced("page.journal")
 def display_journal(war_mode, currency_format, currency_rate):
     st.title("📜 Laporan Pasca-Pertempuran (AAR)" if war_mode else "📓 Jurnal Trading")
     st.write("Refleksikan manuver tempur." if war_mode else "Refleksikan keputusan trading Anda.")
     st.subheader("✍️ Tambah Laporan Baru" if war_mode else "✍️ Tambah Entri Jurnal Baru")
-    all_transactions = get_all_transactions()
-    if not all_transactions.empty:
-        all_transactions['display'] = all_transactions.apply(lambda r: f"ID: {r['id']} | {r['timestamp'][5:16]} | {r['type']} {r['asset']}", axis=1)
-        selected_trx = st.selectbox("Pilih Manuver:" if war_mode else "Pilih Transaksi:", all_transactions['display'])
-        trx_id = int(selected_trx.split(" | ")[0].split(": ")[1])
+    # Pemilih transaksi hanya memuat 50 transaksi terbaru yang cocok dengan pencarian, bukan seluruh ledger
+    search = st.text_input("Cari manuver (ID atau unit):" if war_mode else "Cari transaksi (ID atau aset):", key="trx_search")
+    picker_filters = ledger_filters("trx_picker")
+    candidates, more = get_transactions_page(50, search=search, **picker_filters)
+    if not candidates.empty:
+        labels = dict(zip(candidates['id'].tolist(), ("ID: " + candidates['id'].astype(str) + " | " + candidates['timestamp'].str[5:16] + " | " + candidates['type'] + " " + candidates['asset']).tolist()))
+        trx_id = st.selectbox("Pilih Manuver:" if war_mode else "Pilih Transaksi:", list(labels), format_func=labels.get)
+        if more: st.caption("Menampilkan 50 transaksi terbaru yang cocok; persempit pencarian untuk transaksi lama.")
         entry_reason = st.text_area("Alasan membuka pertempuran?" if war_mode else "Alasan masuk posisi?")
         exit_reason = st.text_area("Rencana/Alasan mundur?" if war_mode else "Rencana/Alasan keluar?")
         lessons_learned = st.text_area("Pelajaran dari pertempuran ini?" if war_mode else "Pelajaran yang didapat?")
         if st.button("Simpan Laporan" if war_mode else "Simpan ke Jurnal"):
             if trx_id and entry_reason and lessons_learned: add_journal_entry(trx_id, entry_reason, exit_reason, lessons_learned); st.success("Laporan tersimpan!"); st.rerun()
             else: st.warning("Isi semua kolom.")
+    elif search or any(picker_filters.values()): st.info("Tidak ada transaksi yang cocok.")
     else: st.info("Lakukan manuver terlebih dahulu.")
     st.markdown("---")
     st.subheader("📚 Arsip Laporan" if war_mode else "📚 Riwayat Jurnal")
-    journal_entries = get_journal_entries()
+    journal_entries = paginate("journal_page", get_journal_page, 20, **ledger_filters("journal"))
     if journal_entries.empty: st.info("Belum ada laporan.")
     else:
         for _, row in journal_entries.iterrows():
@@ -152,7 +220,9 @@ def display_journal(war_mode, currency_format, currency_rate):
                 st.markdown(f"**Detail Manuver:** {row['quantity']} {row['asset']} @ {currency_format.format(price_display)}")
                 st.markdown(f"**Alasan Tempur:**\n{row['entry_reason']}\n\n**Strategi Mundur:**\n{row['exit_reason']}\n\n**Pelajaran:**\n{row['lessons_learned']}")
 
+@perf.traced("page.whale_watcher")
 def display_whale_watcher(war_mode):
+    from whale_watcher import get_stored_transactions, start_background_sync, is_sync_running
     st.title("👁️ Unit Mata-Mata" if war_mode else "🐳 Whale Watcher")
     st.write("Pantau pergerakan Jenderal lain." if war_mode else "Pantau pergerakan wallet penting.")
     with st.expander("Kelola Daftar Pantau"):
@@ -169,46 +239,65 @@ def display_whale_watcher(war_mode):
                 if c2.button("Hapus", key=f"del_{row['id']}"): remove_watched_wallet(row['id']); st.rerun()
     st.markdown("---")
     if not watchlist.empty:
+        c1, c2 = st.columns([0.8, 0.2])
+        if c2.button("Sinkronkan Sekarang"): start_background_sync(min_interval=0)
+        else: start_background_sync()
+        if is_sync_running(): c1.caption("⏳ Sinkronisasi semua wallet berjalan di background...")
         watchlist_dict = pd.Series(watchlist.address.values, index=watchlist.label).to_dict()
         selected_label = st.selectbox("Pilih Target Intelijen:" if war_mode else "Pilih Wallet untuk Dilacak:", list(watchlist_dict.keys()))
         if selected_label:
-            addr = watchlist_dict[selected_label]
-            with st.spinner(f"Mengambil data intelijen untuk {selected_label}..."):
-                txs = get_latest_transactions(addr)
-                if isinstance(txs, pd.DataFrame):
-                    if txs.empty: st.info(f"Tidak ada transaksi token terbaru untuk '{selected_label}'.")
-                    else: st.dataframe(txs, width='stretch')
-                else: st.error(txs)
+            txs = get_stored_transactions(watchlist_dict[selected_label])
+            if txs.empty: st.info(f"Tidak ada transaksi token tersimpan untuk '{selected_label}'.")
+            else: st.dataframe(txs, width='stretch')
 
 # --- STRUKTUR UTAMA APLIKASI ---
-init_db()
 st.set_page_config(layout="wide", page_title="Pandu Terminal")
+init_app()
 local_css("style.css")
-if 'price_alert' not in st.session_state: st.session_state.price_alert = None
 
 st.sidebar.title("Pengaturan")
 war_mode = st.sidebar.toggle("Aktifkan Mode Ruang Perang 🛡️", help="Ubah semua istilah finansial menjadi metafora perang.")
 idr_mode = st.sidebar.toggle("Tampilkan dalam Rupiah (IDR) 🇮🇩", help="Konversi semua nilai ke Rupiah.")
+perf_panel = st.sidebar.toggle("Panel Performa ⏱️", help="Tampilkan waterfall waktu query database, panggilan API, dan halaman untuk rerun ini.")
+if perf_panel or perf.TRACE_FILE: perf.start_trace("rerun")
 if idr_mode:
+    from market_data import get_usd_to_idr_rate
     currency_symbol, usd_to_idr_rate, currency_format = "Rp", get_usd_to_idr_rate(), "Rp {:,.0f}"
 else:
     currency_symbol, usd_to_idr_rate, currency_format = "$", 1.0, "${:,.2f}"
 page_options = ["📈 Dashboard", "📓 Jurnal", "🐳 Whale Watcher"]
 if war_mode: page_options = ["🎖️ Pusat Komando", "📜 Laporan (AAR)", "👁️ Intelijen"]
 page = st.sidebar.radio("Navigasi", page_options)
-st.sidebar.markdown("---")
-
-if page in ["📈 Dashboard", "🎖️ Pusat Komando"]:
-    with st.sidebar:
-        alert_header = "🔔 Peringatan Garis Depan" if war_mode else "🔔 Notifikasi Harga"
-        st.header(alert_header); assets_list = ["BTC", "ETH", "SOL", "BNB"]
-        alert_asset = st.selectbox("Unit Pasukan:" if war_mode else "Aset:", assets_list); alert_condition = st.selectbox("Kondisi:", ["Tembus ke Atas >" if war_mode else "Di Atas >", "Jatuh ke Bawah <" if war_mode else "Di Bawah <"])
-        alert_price_input = st.number_input("Level Koordinat Peta:" if war_mode else f"Level Harga ({currency_symbol}):", 0.0, format="%.2f")
-        if st.button("Atur Peringatan" if war_mode else "Atur Notifikasi"):
-            price_in_usd = alert_price_input / usd_to_idr_rate
-            condition_symbol = ">" if ">" in alert_condition else "<"; st.session_state.price_alert = {"asset": alert_asset, "condition": condition_symbol, "price": price_in_usd}; st.success("Peringatan diatur.")
-    display_dashboard(war_mode, currency_symbol, currency_format, usd_to_idr_rate)
-elif page in ["📓 Jurnal", "📜 Laporan (AAR)"]:
-    display_journal(war_mode, currency_format, usd_to_idr_rate)
-else:
-    display_whale_watcher(war_mode)
\ No newline at end of file
+try:
+    st.sidebar.markdown("---")
+    sync = get_sync_status()
+    if sync["mode"] == "replica":
+        st.sidebar.caption(f"{'🟢' if sync['online'] else '🟠 Offline ·'} Replika lokal: {sync['pending']} perubahan menunggu sinkron (lag {sync['push_lag_s']:.0f} dtk)"
+                           + (f" · ⚠️ {sync['conflicts']} konflik" if sync["conflicts"] else ""))
+    for alert in pop_triggered_alerts().itertuples(index=False):
+        currency_format_alert = "Rp {:,.0f}" if usd_to_idr_rate > 1 else "${:,.2f}"
+        st.toast(f"🔔 ALERT: {alert.asset} {alert.condition} {currency_format_alert.format(alert.price * usd_to_idr_rate)}! (harga {currency_format_alert.format(alert.triggered_price * usd_to_idr_rate)})", icon='💰')
+
+    if page in ["📈 Dashboard", "🎖️ Pusat Komando"]:
+        from alert_engine import get_evaluator
+        alert_evaluator = get_evaluator()
+        with st.sidebar:
+            alert_header = "🔔 Peringatan Garis Depan" if war_mode else "🔔 Notifikasi Harga"
+            st.header(alert_header); assets_list = ["BTC", "ETH", "SOL", "BNB"]
+            alert_asset = st.selectbox("Unit Pasukan:" if war_mode else "Aset:", assets_list); alert_condition = st.selectbox("Kondisi:", ["Tembus ke Atas >" if war_mode else "Di Atas >", "Jatuh ke Bawah <" if war_mode else "Di Bawah <"])
+            alert_price_input = st.number_input("Level Koordinat Peta:" if war_mode else f"Level Harga ({currency_symbol}):", 0.0, format="%.2f")
+            if st.button("Atur Peringatan" if war_mode else "Atur Notifikasi"):
+                price_in_usd = alert_price_input / usd_to_idr_rate
+                condition_symbol = ">" if ">" in alert_condition else "<"; add_price_alert(alert_asset, condition_symbol, price_in_usd); alert_evaluator.notify_changed(); st.success("Peringatan diatur.")
+            currency_format_alert = "Rp {:,.0f}" if usd_to_idr_rate > 1 else "${:,.2f}"
+            for alert in get_active_price_alerts().itertuples(index=False):
+                c1, c2 = st.columns([0.75, 0.25]); c1.info(f"Aktif: {alert.asset} {alert.condition} {currency_format_alert.format(alert.price * usd_to_idr_rate)}")
+                if c2.button("✖", key=f"del_alert_{alert.id}"): remove_price_alert(int(alert.id)); alert_evaluator.notify_changed(); st.rerun()
+        display_dashboard(war_mode, currency_symbol, currency_format, usd_to_idr_rate)
+    elif page in ["📓 Jurnal", "📜 Laporan (AAR)"]:
+        display_journal(war_mode, currency_format, usd_to_idr_rate)
+    else:
+        display_whale_watcher(war_mode)
+finally:
+    trace = perf.end_trace()
+if perf_panel and trace: display_perf_panel(trace)
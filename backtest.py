@@ -0,0 +1,158 @@
+"""Backtest vektor untuk strategi alokasi (momentum, berbasis risiko, regime-switching "AI General", bobot sama).
+
+Jalankan: python backtest.py --assets BTC ETH SOL --start 2022-01-01 --windows 14 30 60 90 --rebalance 7 --workers 4
+"""
+import os
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 365  # pasar kripto buka setiap hari
+STRATEGIES = ("momentum", "risk", "regime", "equal")
+
+# --- BOBOT TARGET (dihitung untuk semua tanggal sekaligus, hanya memakai data s/d tanggal tersebut) ---
+def _normalize(raw, valid):
+    raw = np.where(valid, np.nan_to_num(raw, nan=0.0, posinf=0.0), 0.0)
+    total = raw.sum(axis=1, keepdims=True)
+    equal = valid / np.maximum(valid.sum(axis=1, keepdims=True), 1)
+    # Baris tanpa sinyal positif jatuh ke bobot sama (sama seperti calculate_momentum_allocation)
+    return np.where(total > 0, raw / np.where(total > 0, total, 1), equal)
+
+def momentum_weights(prices, window):
+    """Return `window` hari dipotong di 0, dinormalisasi (lihat calculate_momentum_allocation di app.py)."""
+    p = prices.to_numpy(dtype=float)
+    past = np.full_like(p, np.nan); past[window:] = p[:-window]
+    return _normalize(np.clip(p / past - 1, 0, None), ~np.isnan(p) & ~np.isnan(past))
+
+def risk_weights(prices, window):
+    """Invers volatilitas return harian `window` hari (lihat calculate_risk_based_allocation di app.py)."""
+    vol = prices.pct_change(fill_method=None).rolling(window).std().to_numpy(dtype=float)
+    return _normalize(1 / vol, ~np.isnan(vol) & (vol > 0))
+
+def equal_weights(prices, window=None):
+    valid = ~np.isnan(prices.to_numpy(dtype=float))
+    return _normalize(valid.astype(float), valid)
+
+def regime_weights(prices, window, regime_prices, sma_window=200):
+    """Momentum saat `regime_prices` di atas SMA-`sma_window` (Risk-On), berbasis risiko selain itu."""
+    risk_on = (regime_prices > regime_prices.rolling(sma_window).mean()).to_numpy()[:, None]
+    return np.where(risk_on, momentum_weights(prices, window), risk_weights(prices, window))
+
+# --- SIMULASI ---
+def simulate(prices, target_weights, rebalance_days, warmup, cost_bps=0.0):
+    """Ekuitas harian dengan bobot yang dibiarkan drift di antara tanggal rebalance.
+
+    Bobot ditetapkan pada close tanggal rebalance dan berlaku mulai hari berikutnya. Dalam satu segmen,
+    faktor ekuitas = sum(w_i * P_t,i / P_awal,i), sehingga seluruh simulasi cukup beberapa operasi array.
+    Mengembalikan (Series ekuitas, Series turnover per rebalance).
+    """
+    p = prices.ffill().to_numpy(dtype=float)
+    n_days = len(p)
+    rebalance_idx = np.arange(warmup, n_days - 1, rebalance_days)
+    if len(rebalance_idx) == 0: return pd.Series(dtype=float), pd.Series(dtype=float)
+    seg = np.repeat(np.arange(len(rebalance_idx)), np.diff(np.append(rebalance_idx, n_days - 1)))
+    days = np.arange(rebalance_idx[0] + 1, n_days)
+    start_idx = rebalance_idx[seg]
+    w = target_weights[rebalance_idx]
+    ratio = np.nan_to_num(p[days] / p[start_idx], nan=1.0)
+    growth = (w[seg] * ratio).sum(axis=1)
+
+    seg_end = np.append(np.flatnonzero(np.diff(seg)), len(seg) - 1)
+    end_growth = growth[seg_end]
+    # Bobot hasil drift di akhir segmen vs target baru -> turnover satu sisi
+    drifted = w * ratio[seg_end] / np.where(end_growth > 0, end_growth, 1)[:, None]
+    turnover = np.empty(len(rebalance_idx))
+    turnover[0] = np.abs(w[0]).sum()
+    turnover[1:] = np.abs(w[1:] - drifted[:-1]).sum(axis=1) / 2
+    # Ekuitas awal segmen k = prod(growth akhir segmen sebelumnya) x prod(biaya rebalance s/d k)
+    cost = 1 - turnover * cost_bps / 10_000
+    seg_start_equity = np.cumprod(cost) * np.concatenate([[1.0], np.cumprod(end_growth)[:-1]])
+    equity = seg_start_equity[seg] * growth
+    index = prices.index
+    equity = pd.concat([pd.Series([1.0], index=index[[rebalance_idx[0]]]), pd.Series(equity, index=index[days])])
+    return equity, pd.Series(turnover, index=index[rebalance_idx])
+
+def summarize(equity, turnover):
+    if equity.empty: return {}
+    returns = equity.pct_change().dropna()
+    years = max((equity.index[-1] - equity.index[0]).days / 365.25, 1e-9)
+    drawdown = equity / equity.cummax() - 1
+    vol = returns.std() * np.sqrt(TRADING_DAYS)
+    return {
+        "total_return": equity.iloc[-1] - 1,
+        "cagr": equity.iloc[-1] ** (1 / years) - 1,
+        "volatility": vol,
+        "sharpe": returns.mean() * TRADING_DAYS / vol if vol > 0 else np.nan,
+        "max_drawdown": drawdown.min(),
+        "avg_turnover": turnover.iloc[1:].mean() if len(turnover) > 1 else 0.0,
+    }
+
+def _warmup(strategy, window, sma_window=200):
+    """Jumlah hari sebelum rebalance pertama; simulasi butuh minimal warmup + 2 hari harga."""
+    return max(window + 1, sma_window if strategy == "regime" else 0)
+
+def run_backtest(prices, strategy, window=30, rebalance_days=7, regime_prices=None, sma_window=200, cost_bps=0.0):
+    """Backtest satu strategi. Mengembalikan dict berisi equity, turnover, drawdown, dan ringkasan metrik."""
+    if strategy == "momentum": weights = momentum_weights(prices, window)
+    elif strategy == "risk": weights = risk_weights(prices, window)
+    elif strategy == "equal": weights = equal_weights(prices)
+    elif strategy == "regime":
+        if regime_prices is None: raise ValueError("Strategi regime membutuhkan regime_prices (mis. close BTC-USD).")
+        weights = regime_weights(prices, window, regime_prices.reindex(prices.index).ffill(), sma_window)
+    else: raise ValueError(f"Strategi tidak dikenal: {strategy}")
+    equity, turnover = simulate(prices, weights, rebalance_days, _warmup(strategy, window, sma_window), cost_bps)
+    return {"equity": equity, "turnover": turnover, "drawdown": equity / equity.cummax() - 1 if not equity.empty else equity,
+            "summary": summarize(equity, turnover)}
+
+# --- SWEEP PARAMETER (paralel antar core) ---
+_worker_data = {}
+
+def _init_worker(prices, regime_prices):
+    _worker_data.update(prices=prices, regime_prices=regime_prices)
+
+def _run_one(params):
+    strategy, window, rebalance_days, cost_bps = params
+    result = run_backtest(_worker_data["prices"], strategy, window, rebalance_days, _worker_data["regime_prices"], cost_bps=cost_bps)
+    return {"strategy": strategy, "window": window, "rebalance_days": rebalance_days, **result["summary"]}
+
+def parameter_sweep(prices, windows, rebalance_days=(7,), strategies=STRATEGIES, regime_prices=None, cost_bps=0.0, workers=None):
+    """Semua kombinasi strategi x window x interval rebalance, dijalankan di process pool; hasil berupa DataFrame."""
+    combos = [(s, w, r, cost_bps) for s, w, r in itertools.product(strategies, windows, rebalance_days)
+              if not (s == "regime" and regime_prices is None)]
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1:
+        _init_worker(prices, regime_prices); rows = list(map(_run_one, combos))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(prices, regime_prices)) as pool:
+            rows = list(pool.map(_run_one, combos, chunksize=max(1, len(combos) // (workers * 4))))
+    results = pd.DataFrame(rows)
+    if "sharpe" not in results:
+        # Tidak ada kombinasi yang melewati warmup-nya, jadi tidak ada metrik untuk diurutkan
+        needed = min((_warmup(s, w) + 2 for s, w, _, _ in combos), default=0)
+        raise ValueError(f"Riwayat harga terlalu pendek ({len(prices)} hari): kombinasi terpendek butuh minimal {needed} hari "
+                         "(window + 1, atau SMA 200 hari untuk strategi regime, ditambah 2 hari simulasi)." if combos else "Tidak ada kombinasi strategi yang bisa dijalankan.")
+    return results.sort_values("sharpe", ascending=False, ignore_index=True)
+
+if __name__ == "__main__":
+    from ohlcv_store import get_close_matrix
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--assets", nargs="+", default=["BTC", "ETH", "SOL"])
+    parser.add_argument("--start", type=date.fromisoformat, default=date.today() - timedelta(days=3 * 365))
+    parser.add_argument("--end", type=date.fromisoformat, default=date.today())
+    parser.add_argument("--windows", nargs="+", type=int, default=[14, 30, 60, 90])
+    parser.add_argument("--rebalance", nargs="+", type=int, default=[7])
+    parser.add_argument("--cost-bps", type=float, default=10.0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--offline", action="store_true", help="pakai harga yang sudah ada di cache lokal saja")
+    args = parser.parse_args()
+    symbols = sorted({f"{a}-USD" for a in args.assets} | {"BTC-USD"})
+    closes = get_close_matrix(symbols, args.start, args.end, sync_first=not args.offline)
+    prices = closes[[f"{a}-USD" for a in args.assets]].rename(columns=lambda c: c.replace("-USD", ""))
+    try:
+        results = parameter_sweep(prices, args.windows, args.rebalance, regime_prices=closes["BTC-USD"], cost_bps=args.cost_bps, workers=args.workers)
+    except ValueError as e:
+        raise SystemExit(f"Gagal: {e}")
+    with pd.option_context("display.width", 160, "display.float_format", "{:,.4f}".format): print(results.to_string())
@@ -0,0 +1,178 @@
+"""Pengganti lokal untuk layanan eksternal: Turso (file libsql), yfinance, Etherscan/F&G/CoinGecko (server HTTP lokal) dan Gemini.
+
+Semua pengganti punya latensi yang bisa diatur supaya hasil benchmark mendekati kondisi jaringan sungguhan.
+"""
+import os
+import time
+import zlib
+import random
+import asyncio
+import threading
+import numpy as np
+import pandas as pd
+from aiohttp import web
+
+# --- HARGA (fixture rekaman atau sintetis deterministik) ---
+class FakeYFinance:
+    """Pengganti `yfinance.download`: frame OHLCV dengan kolom MultiIndex (Price, Ticker) seperti yfinance 1.x.
+
+    `fixture_path` (CSV berkolom date,symbol,close) dipakai bila ada; simbol yang tidak ada di fixture dibuat sintetis.
+    """
+
+    def __init__(self, latency=0.0, fixture_path=None, seed=0):
+        self.latency, self.seed, self.calls = latency, seed, 0
+        self.fixture = None
+        if fixture_path:
+            self.fixture = pd.read_csv(fixture_path, parse_dates=["date"]).pivot(index="date", columns="symbol", values="close")
+
+    def _closes(self, symbol, index):
+        if self.fixture is not None and symbol in self.fixture.columns:
+            return self.fixture[symbol].reindex(index).ffill().bfill().to_numpy()
+        rng = np.random.default_rng(zlib.crc32(f"{symbol}|{self.seed}".encode()))
+        base = 16000.0 if symbol == "IDR=X" else rng.uniform(1, 60000)
+        steps = rng.normal(0, 0.001 if symbol == "IDR=X" else 0.03, len(index))
+        return base * np.exp(np.cumsum(steps))
+
+    def download(self, tickers, start=None, period=None, **kwargs):
+        self.calls += 1
+        if self.latency: time.sleep(self.latency)
+        symbols = [tickers] if isinstance(tickers, str) else list(tickers)
+        end = pd.Timestamp.today().normalize()
+        index = pd.date_range(start or end - pd.Timedelta(days=int(str(period or "5d").rstrip("d"))), end, freq="D")
+        frames = {}
+        for symbol in symbols:
+            close = self._closes(symbol, index)
+            frames[symbol] = pd.DataFrame({"Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close, "Adj Close": close, "Volume": 1e6}, index=index)
+        data = pd.concat(frames, axis=1).swaplevel(0, 1, axis=1).sort_index(axis=1)
+        data.columns.names = ["Price", "Ticker"]
+        return data
+
+    def install(self):
+        import yfinance
+        yfinance.download = self.download
+        return self
+
+# --- SERVER HTTP LOKAL (Etherscan, Fear & Greed, CoinGecko) ---
+class FakeHTTPServer:
+    """Server aiohttp di thread sendiri. Etherscan `tokentx` mendukung startblock/page/offset/sort=asc."""
+
+    def __init__(self, latency=0.0, transfers_per_wallet=50, port=0):
+        self.latency, self.transfers_per_wallet, self.port = latency, transfers_per_wallet, port
+        self.requests = 0
+        self._loop, self._runner = None, None
+
+    def _transfers(self, address):
+        rng = random.Random(address)
+        other = "0x" + "ee" * 20
+        return [{
+            "blockNumber": str(18_000_000 + i * 10), "timeStamp": str(1_700_000_000 + i * 120), "hash": f"0x{address[2:10]}{i:056x}",
+            "from": address if i % 2 else other, "to": other if i % 2 else address, "contractAddress": "0x" + "dd" * 20,
+            "value": str(rng.randint(1, 10**24)), "tokenName": "Tether USD", "tokenSymbol": rng.choice(["USDT", "WETH", "WBTC"]),
+            "tokenDecimal": rng.choice(["6", "18", "8"]),
+        } for i in range(self.transfers_per_wallet)]
+
+    async def _delay(self):
+        self.requests += 1
+        if self.latency: await asyncio.sleep(self.latency)
+
+    async def _etherscan(self, request):
+        await self._delay()
+        q = request.query
+        page, offset, start_block = int(q.get("page", 1)), int(q.get("offset", 25)), int(q.get("startblock", 0))
+        rows = [t for t in self._transfers(q["address"].lower()) if int(t["blockNumber"]) >= start_block]
+        if q.get("sort") == "desc": rows.reverse()
+        rows = rows[(page - 1) * offset:page * offset]
+        if not rows: return web.json_response({"status": "0", "message": "No transactions found", "result": []})
+        return web.json_response({"status": "1", "message": "OK", "result": rows})
+
+    async def _fng(self, request):
+        await self._delay()
+        return web.json_response({"data": [{"value": "55", "value_classification": "Greed"}]})
+
+    async def _global(self, request):
+        await self._delay()
+        return web.json_response({"data": {"market_cap_percentage": {"btc": 54.321}}})
+
+    def start(self):
+        ready = threading.Event()
+        async def serve():
+            app = web.Application()
+            app.router.add_get("/etherscan/api", self._etherscan)
+            app.router.add_get("/fng/", self._fng)
+            app.router.add_get("/coingecko/global", self._global)
+            self._runner = web.AppRunner(app, access_log=None)
+            await self._runner.setup()
+            site = web.TCPSite(self._runner, "127.0.0.1", self.port)
+            await site.start()
+            self.port = site._server.sockets[0].getsockname()[1]
+            ready.set()
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(serve())
+            self._loop.run_forever()
+        threading.Thread(target=run, name="fake_http", daemon=True).start()
+        ready.wait(10)
+        return self
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def install(self):
+        """Arahkan modul aplikasi ke server ini (ETHERSCAN_API_URL juga di-set untuk impor berikutnya)."""
+        os.environ["ETHERSCAN_API_URL"] = f"{self.base_url}/etherscan/api"
+        os.environ.setdefault("ETHERSCAN_API_KEY", "benchmark")
+        import market_data, whale_watcher
+        market_data.FNG_URL = f"{self.base_url}/fng/?limit=1"
+        market_data.COINGECKO_GLOBAL_URL = f"{self.base_url}/coingecko/global"
+        whale_watcher.ETHERSCAN_API_URL = os.environ["ETHERSCAN_API_URL"]
+        whale_watcher.ETHERSCAN_API_KEY = os.environ["ETHERSCAN_API_KEY"]
+        return self
+
+# --- MODEL AI ---
+class StubModel:
+    """Pengganti GenerativeModel: `first_token_latency` sebelum potongan pertama, `chunk_latency` antar potongan."""
+
+    class _Chunk:
+        def __init__(self, text): self.text = text
+
+    def __init__(self, first_token_latency=0.0, chunk_latency=0.0, chunks=20):
+        self.first_token_latency, self.chunk_latency, self.chunks, self.calls = first_token_latency, chunk_latency, chunks, 0
+
+    def _stream(self):
+        time.sleep(self.first_token_latency)
+        for i in range(self.chunks):
+            if i: time.sleep(self.chunk_latency)
+            yield self._Chunk(f"Potongan briefing {i}. ")
+
+    def generate_content(self, prompt, stream=False):
+        self.calls += 1
+        if stream: return self._stream()
+        return self._Chunk("".join(c.text for c in self._stream()))
+
+# --- DATABASE LOKAL ---
+def seed_database(transactions=1000, wallets=20, journal_entries=100, seed=0):
+    """Isi database (TURSO_DATABASE_URL harus sudah mengarah ke file lokal) dengan data sintetis dalam batch besar."""
+    import libsql_client
+    from database import connection, init_db, rebuild_holdings
+    rng = np.random.default_rng(seed)
+    init_db()
+    assets = np.array(["BTC", "ETH", "SOL", "BNB", "USDT"])
+    types = rng.choice(["BUY", "BUY", "SELL", "DEPOSIT"], size=transactions)
+    start = pd.Timestamp("2022-01-01")
+    stamps = (start + pd.to_timedelta(np.sort(rng.integers(0, 3 * 365 * 86400, transactions)), unit="s")).strftime("%Y-%m-%d %H:%M:%S")
+    rows = list(zip(stamps, rng.choice(assets, transactions), types, rng.uniform(0.01, 2, transactions).round(6), rng.uniform(1, 60000, transactions).round(2)))
+    stmts = [libsql_client.Statement(
+        "INSERT INTO transactions (timestamp, asset, type, quantity, price) VALUES " + ", ".join(["(?, ?, ?, ?, ?)"] * len(chunk)),
+        [str(v) if isinstance(v, np.str_) else (float(v) if isinstance(v, np.floating) else v) for row in chunk for v in row]
+    ) for chunk in (rows[i:i + 500] for i in range(0, len(rows), 500))]
+    stmts += [libsql_client.Statement(
+        "INSERT OR IGNORE INTO watched_wallets (address, label) VALUES (?, ?)", (f"0x{i:040x}", f"Whale {i:04d}")
+    ) for i in range(wallets)]
+    stmts += [libsql_client.Statement(
+        "INSERT INTO trading_journal (transaction_id, entry_reason, exit_reason, lessons_learned) VALUES (?, ?, ?, ?)",
+        (int(rng.integers(1, transactions + 1)), "Breakout", "Target tercapai", "Disiplin stop loss")
+    ) for _ in range(journal_entries)]
+    with connection() as conn:
+        for i in range(0, len(stmts), 200): conn.batch(stmts[i:i + 200])
+    rebuild_holdings(fix=True)
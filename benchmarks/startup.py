@@ -0,0 +1,83 @@
+"""Laporan waktu startup: rincian waktu impor per modul dan (opsional) overhead per rerun Streamlit.
+
+Jalankan:
+    python benchmarks/startup.py                 # rincian impor, tiap modul di interpreter baru
+    python benchmarks/startup.py --rerun         # + waktu run pertama & rerun halaman Jurnal via AppTest
+    python benchmarks/startup.py --json out.json # simpan hasil untuk dibandingkan antar rilis
+
+--rerun menjalankan app.py sungguhan, jadi arahkan TURSO_DATABASE_URL ke database lokal (mis. file:/tmp/bench.db).
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modul aplikasi dulu, lalu dependensi pihak ketiga yang paling berat
+MODULES = [
+    "database", "market_data", "price_service", "ohlcv_store", "whale_watcher", "alert_engine", "ai_module",
+    "streamlit", "pandas", "libsql_client", "yfinance", "google.generativeai", "aiohttp", "websockets",
+]
+# Yang diimpor app.py sebelum halaman apa pun dirender
+APP_BASE_MODULES = ["streamlit", "nest_asyncio", "pandas", "database"]
+
+def import_time(modules, repeat=3):
+    """Waktu impor kumulatif (ms) di interpreter baru, median dari `repeat` kali, plus 5 sub-impor terberat."""
+    code = "; ".join(f"import {m}" for m in modules)
+    totals, children = [], {}
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, capture_output=True, text=True, env={**os.environ, "PYTHONWARNINGS": "ignore"})
+        if result.returncode != 0: raise RuntimeError(result.stderr.strip().splitlines()[-1])
+        rows = []
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line: continue
+            _, cumulative_us, name = line.replace("import time:", "").split("|")
+            rows.append((name[1:], int(cumulative_us)))
+        totals.append(sum(us for name, us in rows if not name.startswith(" ")) / 1000)
+        for name, us in rows:
+            if name.startswith("  ") and not name.startswith("   "): children.setdefault(name.strip(), []).append(us / 1000)
+    heaviest = sorted(((n, statistics.median(v)) for n, v in children.items()), key=lambda x: -x[1])[:5]
+    return statistics.median(totals), heaviest
+
+def rerun_times(reruns=5):
+    """Run pertama app.py (cold) dan rerun halaman Jurnal (warm) menggunakan streamlit AppTest."""
+    from streamlit.testing.v1 import AppTest
+    os.chdir(ROOT)  # app.py membaca style.css relatif terhadap cwd
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=120)
+    start = time.perf_counter(); at.run(); first = time.perf_counter() - start
+    at.sidebar.radio[0].set_value("📓 Jurnal")
+    warm = []
+    for _ in range(reruns):
+        start = time.perf_counter(); at.run(); warm.append(time.perf_counter() - start)
+    return {"first_run_ms": first * 1000, "journal_rerun_ms": statistics.median(warm) * 1000, "exceptions": [str(e.value) for e in at.exception]}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rerun", action="store_true", help="ukur juga run pertama & rerun app.py via AppTest")
+    parser.add_argument("--json", metavar="PATH", help="tulis hasil ke file JSON")
+    args = parser.parse_args()
+    report = {"python": sys.version.split()[0], "modules": {}}
+    print(f"{'modul':<22} {'impor (ms)':>11}   sub-impor terberat")
+    for module in MODULES:
+        try:
+            total, heaviest = import_time([module])
+        except Exception as e:
+            print(f"{module:<22} {'gagal':>11}   {e}"); continue
+        report["modules"][module] = {"import_ms": total, "heaviest": heaviest}
+        print(f"{module:<22} {total:>11.1f}   " + ", ".join(f"{n} {ms:.0f}" for n, ms in heaviest[:3]))
+    base, _ = import_time(APP_BASE_MODULES)
+    report["app_base_import_ms"] = base
+    print(f"\nImpor dasar app.py (sebelum halaman dirender): {base:.1f} ms")
+    if args.rerun:
+        report["rerun"] = rerun_times()
+        print(f"Run pertama app.py: {report['rerun']['first_run_ms']:.0f} ms, rerun halaman Jurnal: {report['rerun']['journal_rerun_ms']:.1f} ms")
+        for e in report["rerun"]["exceptions"]: print(f"  exception: {e}")
+    if args.json:
+        with open(args.json, "w") as f: json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Benchmark offline untuk jalur panas aplikasi, memakai pengganti lokal dari benchmarks/fakes.py.
+
+Jalankan:
+    python benchmarks/suite.py --transactions 100000 --wallets 500 --latency-ms 50 --json hasil.json
+    python benchmarks/suite.py --compare baseline.json    # exit 1 jika ada skenario melambat > --threshold
+    python benchmarks/suite.py --only db. market.         # hanya skenario dengan prefiks tertentu
+    python benchmarks/suite.py --replica --only db.        # mode local-first: bench.db jadi primary, query dari replika lokal
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+def measure(fn, repeat, setup=None):
+    timings = []
+    for _ in range(repeat):
+        if setup: setup()
+        start = time.perf_counter(); fn(); timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {"median_ms": statistics.median(timings), "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))], "min_ms": timings[0], "n": repeat}
+
+def build_scenarios(args, fake_yf, fake_http, stub_model):
+    """Daftar (nama, fungsi, setup, repeat). Diimpor di sini karena env harus sudah diarahkan ke pengganti lokal."""
+    import database, market_data, price_service, whale_watcher, ai_module
+    wallets = database.get_watched_wallets()['address'].tolist()
+    first_wallet = wallets[0] if wallets else "0x" + "00" * 20
+    def reset_market(): market_data._snapshot_cache.clear()
+    def whale_sync(): asyncio.run(whale_watcher.sync_all_wallets(wallets, rate=args.etherscan_rate))
+    def ai_first_chunk():
+        ai_module.set_model(stub_model)
+        next(iter(ai_module.stream_analisis_ai(f"topik {time.perf_counter_ns()}")))
+    ai_module.dapatkan_analisis_ai("topik cache")
+    r = args.repeat
+    return [
+        ("db.dashboard_snapshot", database.get_dashboard_snapshot, None, r),
+        ("db.all_transactions", database.get_all_transactions, None, max(1, r // 4)),
+        ("db.journal_entries", database.get_journal_entries, None, r),
+        ("db.transactions_page", lambda: database.get_transactions_page(50), None, r),
+        ("db.transactions_page_filtered", lambda: database.get_transactions_page(50, asset="SOL", tr_type="SELL"), None, r),
+        ("db.journal_page", lambda: database.get_journal_page(20), None, r),
+        ("db.watched_wallets", database.get_watched_wallets, None, r),
+        ("db.add_transaction", lambda: database.add_transaction("BTC", "BUY", 0.001, 50000.0), None, r),
+        ("market.snapshot_cold", market_data.get_market_snapshot, reset_market, r),
+        ("market.snapshot_warm", market_data.get_market_snapshot, None, r),
+        ("price.bulk_cold", lambda: price_service.get_asset_prices(["BTC", "ETH", "SOL", "BNB"]), price_service.clear_cache, r),
+        ("price.bulk_warm", lambda: price_service.get_asset_prices(["BTC", "ETH", "SOL", "BNB"]), None, r),
+        ("market.usd_idr_warm", market_data.get_usd_to_idr_rate, None, r),
+        ("whale.sync_all_wallets", whale_sync, None, 1),
+        ("whale.sync_incremental", whale_sync, None, 1),
+        ("whale.stored_transactions", lambda: whale_watcher.get_stored_transactions(first_wallet), None, r),
+        ("ai.time_to_first_chunk", ai_first_chunk, None, r),
+        ("ai.cached_briefing", lambda: ai_module.dapatkan_analisis_ai("topik cache"), None, r),
+    ]
+
+def page_scenarios(repeat):
+    """Rerun halaman penuh app.py lewat streamlit AppTest (run pertama dicatat terpisah)."""
+    from streamlit.testing.v1 import AppTest
+    os.chdir(ROOT)  # app.py membaca style.css relatif terhadap cwd
+    results = {}
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=300)
+    start = time.perf_counter(); at.run(); results["page.first_run"] = {"median_ms": (time.perf_counter() - start) * 1000, "n": 1}
+    for name, label in [("page.dashboard", "📈 Dashboard"), ("page.journal", "📓 Jurnal"), ("page.whale_watcher", "🐳 Whale Watcher")]:
+        at.sidebar.radio[0].set_value(label)
+        results[name] = measure(at.run, repeat)
+        if at.exception: results[name]["exceptions"] = [str(e.value) for e in at.exception]
+    return results
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path) as f: baseline = json.load(f)["results"]
+    regressions = []
+    print(f"\n{'skenario':<28} {'baseline':>10} {'sekarang':>10} {'delta':>8}")
+    for name, now in results.items():
+        if name not in baseline: continue
+        before, after = baseline[name]["median_ms"], now["median_ms"]
+        delta = (after - before) / before if before else 0.0
+        flag = "  <-- REGRESI" if delta > threshold else ""
+        if flag: regressions.append(name)
+        print(f"{name:<28} {before:>10.2f} {after:>10.2f} {delta:>+8.0%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transactions", type=int, default=10_000)
+    parser.add_argument("--wallets", type=int, default=50)
+    parser.add_argument("--transfers-per-wallet", type=int, default=50)
+    parser.add_argument("--journal-entries", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="latensi tambahan setiap panggilan HTTP/yfinance palsu")
+    parser.add_argument("--ai-latency-ms", type=float, default=300.0, help="latensi stub AI sebelum potongan pertama")
+    parser.add_argument("--etherscan-rate", type=float, default=1000.0, help="batas request/detik untuk Etherscan palsu")
+    parser.add_argument("--price-fixture", help="CSV harga rekaman (date,symbol,close)")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--no-pages", action="store_true", help="lewati rerun halaman via AppTest")
+    parser.add_argument("--replica", action="store_true", help="jalankan dengan TURSO_REPLICA_PATH (replika lokal + sinkron ke bench.db)")
+    parser.add_argument("--only", nargs="+", help="hanya skenario dengan prefiks ini")
+    parser.add_argument("--json", metavar="PATH", help="tulis laporan ke file JSON")
+    parser.add_argument("--compare", metavar="BASELINE", help="bandingkan dengan laporan JSON sebelumnya")
+    parser.add_argument("--threshold", type=float, default=0.25, help="batas regresi median (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="pandu_bench_")
+    os.environ.update({
+        "TURSO_DATABASE_URL": f"file:{os.path.join(workdir, 'bench.db')}", "TURSO_AUTH_TOKEN": "",
+        "OHLCV_DB_PATH": os.path.join(workdir, "ohlcv.db"), "GOOGLE_API_KEY": os.environ.get("GOOGLE_API_KEY") or "benchmark",
+        "ETHERSCAN_API_KEY": "benchmark",
+    })
+    if args.replica: os.environ["TURSO_REPLICA_PATH"] = os.path.join(workdir, "replica.db")
+    from fakes import FakeYFinance, FakeHTTPServer, StubModel, seed_database
+    latency = args.latency_ms / 1000
+    fake_yf = FakeYFinance(latency, args.price_fixture).install()
+    fake_http = FakeHTTPServer(latency, args.transfers_per_wallet).start().install()
+    stub_model = StubModel(args.ai_latency_ms / 1000, latency / 10)
+    import ai_module; ai_module.set_model(stub_model)
+
+    start = time.perf_counter()
+    seed_database(args.transactions, args.wallets, args.journal_entries)
+    print(f"Seed {args.transactions:,} transaksi, {args.wallets} wallet: {time.perf_counter() - start:.1f} s ({workdir})")
+    if args.replica:
+        import database
+        start = time.perf_counter(); database.sync_replica(pull=False)
+        print(f"Outbox seed didorong ke primary: {time.perf_counter() - start:.1f} s")
+
+    results = {}
+    for name, fn, setup, repeat in build_scenarios(args, fake_yf, fake_http, stub_model):
+        if args.only and not name.startswith(tuple(args.only)): continue
+        results[name] = measure(fn, repeat, setup)
+        print(f"{name:<28} median {results[name]['median_ms']:>9.2f} ms   p95 {results[name]['p95_ms']:>9.2f} ms")
+    if not args.no_pages and (not args.only or any("page.".startswith(p) or p.startswith("page") for p in args.only)):
+        for name, result in page_scenarios(max(1, args.repeat // 2)).items():
+            results[name] = result
+            print(f"{name:<28} median {result['median_ms']:>9.2f} ms" + (f"   exceptions: {result['exceptions']}" if result.get("exceptions") else ""))
+
+    report = {"config": {k: v for k, v in vars(args).items() if k not in ("json", "compare", "only")}, "python": sys.version.split()[0],
+              "counters": {"yfinance_calls": fake_yf.calls, "http_requests": fake_http.requests, "ai_calls": stub_model.calls}, "results": results}
+    if args.replica:
+        import database
+        report["replica"] = database.get_sync_status(); print(f"Status replika: {report['replica']}")
+    if args.json:
+        with open(args.json, "w") as f: json.dump(report, f, indent=2)
+    if args.compare and compare(results, args.compare, args.threshold): sys.exit(1)
+
+if __name__ == "__main__":
+    main()
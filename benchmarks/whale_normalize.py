@@ -0,0 +1,65 @@
+"""Micro-benchmark normalisasi transfer token Whale Watcher.
+
+Jalankan: python benchmarks/whale_normalize.py [--rows 100000]
+Gagal (exit 1) jika waktu per baris pada ukuran terbesar lebih dari 3x ukuran terkecil.
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from whale_watcher import normalize_token_transfers
+
+WALLET = "0x" + "ab" * 20
+
+def make_transfers(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    decimals = rng.choice([6, 8, 18], size=rows)
+    digits = rng.integers(1, 27, size=rows)
+    values = [str(rng.integers(1, 10)) + "".join(map(str, rng.integers(0, 10, size=n - 1))) for n in digits]
+    addresses = np.array([WALLET.upper(), "0x" + "cd" * 20])
+    return pd.DataFrame({
+        "value": values, "tokenDecimal": decimals.astype(str),
+        "timeStamp": (1_700_000_000 + np.arange(rows)).astype(str),
+        "from": addresses[rng.integers(0, 2, size=rows)], "to": WALLET,
+        "tokenSymbol": rng.choice(["USDT", "WETH", "WBTC"], size=rows),
+    })
+
+def legacy_normalize(df, wallet_address):
+    df = df.copy()
+    df['value'] = pd.to_numeric(df['value'], errors='coerce').fillna(0)
+    df['tokenDecimal'] = pd.to_numeric(df['tokenDecimal'], errors='coerce').fillna(18).astype(int)
+    df['value'] = df.apply(lambda row: row['value'] / (10**row['tokenDecimal']) if row['tokenDecimal'] > 0 else row['value'], axis=1)
+    df['Arah'] = df.apply(lambda row: 'KELUAR' if row['from'].lower() == wallet_address.lower() else 'MASUK', axis=1)
+    return df
+
+def best_of(fn, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter(); fn(); timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+    sizes = [args.rows // 10, args.rows // 4, args.rows // 2, args.rows]
+    per_row = []
+    print(f"{'baris':>10} {'vektor (ms)':>12} {'us/baris':>10}")
+    for n in sizes:
+        df = make_transfers(n)
+        t = best_of(lambda: normalize_token_transfers(df, WALLET))
+        per_row.append(t / n)
+        print(f"{n:>10,} {t * 1000:>12.1f} {t / n * 1e6:>10.3f}")
+    small = make_transfers(sizes[0])
+    t_legacy, t_vec = best_of(lambda: legacy_normalize(small, WALLET), 1), best_of(lambda: normalize_token_transfers(small, WALLET))
+    print(f"apply() lama pada {sizes[0]:,} baris: {t_legacy * 1000:.1f} ms ({t_legacy / t_vec:.1f}x lebih lambat)")
+    ratio = per_row[-1] / per_row[0]
+    print(f"rasio waktu/baris terbesar vs terkecil: {ratio:.2f}")
+    sys.exit(0 if ratio <= 3 else 1)
+
+if __name__ == "__main__":
+    main()
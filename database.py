@@ -1,13 +1,32 @@
 # File: database.py (Versi Final dengan Turso & libsql-client)
 
 import os
+import time
+import threading
+from contextlib import contextmanager
 import pandas as pd
-from datetime import date
+from datetime import date, timedelta
+import aiohttp
 import libsql_client # <-- Menggunakan library baru
 from dotenv import load_dotenv
+import perf
+from replica import ReplicaClient
 
 load_dotenv()
 
+# Interval (detik) minimum antar health check pada client bersama
+HEALTH_CHECK_INTERVAL = float(os.getenv("TURSO_HEALTH_CHECK_INTERVAL", "30"))
+# Mode local-first: jika di-set (mis. trading_data.db), semua query dilayani replika SQLite lokal ini dan
+# perubahan didorong ke TURSO_DATABASE_URL oleh worker sinkron di background (lihat replica.py)
+REPLICA_PATH = os.getenv("TURSO_REPLICA_PATH", "")
+
+# Kode LibsqlError yang berarti koneksi ke server putus (bukan error SQL): client harus dibuang lalu reconnect
+CONNECTION_ERROR_CODES = {"HRANA_WEBSOCKET_ERROR", "HRANA_PROTO_ERROR", "CLIENT_CLOSED", "SERVER_ERROR"}
+
+_client = None
+_client_checked_at = 0.0
+_client_lock = threading.Lock()
+
 # Fungsi untuk membuat koneksi ke Turso
 def create_connection():
     url = os.getenv("TURSO_DATABASE_URL")
@@ -15,79 +34,497 @@ def create_connection():
     if not url:
         raise ValueError("URL Database Turso tidak ditemukan di environment variables.")
     # Untuk koneksi lokal saat testing, auth_token bisa dikosongkan
-    return libsql_client.create_client(url=url, auth_token=auth_token)
+    primary = lambda: libsql_client.create_client_sync(url=url, auth_token=auth_token)
+    return ReplicaClient(REPLICA_PATH, primary, _create_schema) if REPLICA_PATH else primary()
+
+def _client_healthy(client):
+    if client.closed: return False
+    try:
+        client.execute("SELECT 1")
+        return True
+    except Exception:
+        return False
+
+def get_client():
+    """Mengembalikan client libsql bersama (satu per proses), membuat ulang jika mati."""
+    global _client, _client_checked_at
+    with _client_lock:
+        now = time.monotonic()
+        if _client is not None and now - _client_checked_at >= HEALTH_CHECK_INTERVAL:
+            if not _client_healthy(_client): _discard_client()
+            else: _client_checked_at = now
+        if _client is None:
+            with perf.span("db.connect"): _client, _client_checked_at = create_connection(), now
+        return _client
+
+def _discard_client():
+    global _client
+    if _client is not None:
+        try: _client.close()
+        except Exception: pass
+    _client = None
+
+def close_client():
+    """Hook lifecycle: tutup client bersama (dipanggil saat proses selesai atau untuk memaksa reconnect)."""
+    with _client_lock: _discard_client()
+
+def _close_client_on_exit():
+    # Thread executor libsql bukan daemon, sehingga atexit baru jalan setelah thread itu selesai (tidak pernah).
+    # Tunggu thread utama berhenti lalu tutup client agar proses bisa keluar dengan bersih.
+    threading.main_thread().join()
+    close_client()
+
+threading.Thread(target=_close_client_on_exit, name="libsql_client_closer", daemon=True).start()
+
+def _sql_label(stmt):
+    sql = stmt.sql if isinstance(stmt, libsql_client.Statement) else stmt
+    return " ".join(sql.split())[:120]
+
+class _TracedClient:
+    """Pembungkus client selama ada trace aktif: setiap execute/batch (satu round trip) dicatat sebagai span."""
+
+    def __init__(self, client): self._client = client
+
+    def execute(self, stmt, args=None):
+        with perf.span("db.execute", sql=_sql_label(stmt)) as s:
+            rs = self._client.execute(stmt, args)
+            s.set(rows=len(rs.rows)); return rs
+
+    def batch(self, stmts):
+        with perf.span("db.batch", sql=_sql_label(stmts[0]) if stmts else "", statements=len(stmts)) as s:
+            results = self._client.batch(stmts)
+            s.set(rows=sum(len(rs.rows) for rs in results)); return results
+
+    def __getattr__(self, name): return getattr(self._client, name)
+
+def _is_connection_error(e):
+    if isinstance(e, libsql_client.LibsqlError): return e.code in CONNECTION_ERROR_CODES
+    return isinstance(e, (aiohttp.ClientError, OSError))  # termasuk TimeoutError dan ConnectionError
+
+@contextmanager
+def connection():
+    """Meminjam client bersama; jika koneksi ke server putus, client dibuang agar panggilan berikutnya reconnect.
+    Error SQL dan exception dari kode pemanggil diteruskan tanpa menyentuh client (dipakai bersama semua thread)."""
+    client = get_client()
+    try:
+        yield _TracedClient(client) if perf.active() else client
+    except Exception as e:
+        if _is_connection_error(e):
+            with _client_lock:
+                if _client is client: _discard_client()
+        raise
+
+def _create_schema(conn):
+    """DDL idempoten; dipakai init_db dan juga untuk replika lokal beserta primary-nya."""
+    conn.batch([
+        "CREATE TABLE IF NOT EXISTS transactions (id INTEGER PRIMARY KEY, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP, asset TEXT, type TEXT, quantity REAL, price REAL)",
+        "CREATE TABLE IF NOT EXISTS portfolio_history (snapshot_date DATE PRIMARY KEY, total_value_usd REAL)",
+        "CREATE TABLE IF NOT EXISTS trading_journal (id INTEGER PRIMARY KEY, transaction_id INTEGER, entry_reason TEXT, exit_reason TEXT, lessons_learned TEXT, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP, FOREIGN KEY (transaction_id) REFERENCES transactions (id))",
+        "CREATE TABLE IF NOT EXISTS watched_wallets (id INTEGER PRIMARY KEY, address TEXT NOT NULL UNIQUE, label TEXT, chain TEXT DEFAULT 'Ethereum')",
+        "CREATE TABLE IF NOT EXISTS holdings (asset TEXT PRIMARY KEY, quantity REAL NOT NULL DEFAULT 0, cost_basis REAL NOT NULL DEFAULT 0, realized_pl REAL NOT NULL DEFAULT 0)",
+        "CREATE TABLE IF NOT EXISTS ledger_totals (name TEXT PRIMARY KEY, value REAL NOT NULL DEFAULT 0)",
+        "CREATE TABLE IF NOT EXISTS whale_transfers (id INTEGER PRIMARY KEY, wallet_address TEXT NOT NULL, block_number INTEGER NOT NULL, time_stamp INTEGER NOT NULL, hash TEXT NOT NULL, contract_address TEXT, from_address TEXT, to_address TEXT, value TEXT, token_symbol TEXT, token_decimal TEXT, UNIQUE (wallet_address, hash, contract_address, from_address, to_address, value))",
+        "CREATE INDEX IF NOT EXISTS idx_whale_transfers_wallet_time ON whale_transfers (wallet_address, time_stamp DESC)",
+        "CREATE TABLE IF NOT EXISTS wallet_sync_state (wallet_address TEXT PRIMARY KEY, start_block INTEGER NOT NULL DEFAULT 0, last_synced DATETIME)",
+        "CREATE TABLE IF NOT EXISTS price_alerts (id INTEGER PRIMARY KEY, asset TEXT NOT NULL, condition TEXT NOT NULL CHECK (condition IN ('>', '<')), price REAL NOT NULL, created_at DATETIME DEFAULT CURRENT_TIMESTAMP, triggered_at DATETIME, triggered_price REAL, acknowledged INTEGER NOT NULL DEFAULT 0)",
+        "CREATE INDEX IF NOT EXISTS idx_price_alerts_pending ON price_alerts (triggered_at, acknowledged)",
+        "CREATE TABLE IF NOT EXISTS ai_briefings (cache_key TEXT PRIMARY KEY, topic TEXT, briefing_date DATE, prompt_version TEXT, response TEXT NOT NULL, created_at DATETIME DEFAULT CURRENT_TIMESTAMP, last_used DATETIME DEFAULT CURRENT_TIMESTAMP)",
+        "CREATE INDEX IF NOT EXISTS idx_ai_briefings_last_used ON ai_briefings (last_used)",
+        "CREATE INDEX IF NOT EXISTS idx_transactions_timestamp ON transactions (timestamp, id)",
+        "CREATE INDEX IF NOT EXISTS idx_transactions_asset_timestamp ON transactions (asset, timestamp, id)",
+        "CREATE INDEX IF NOT EXISTS idx_trading_journal_transaction ON trading_journal (transaction_id)",
+        "CREATE INDEX IF NOT EXISTS idx_trading_journal_timestamp ON trading_journal (timestamp, id)",
+        "CREATE TABLE IF NOT EXISTS import_jobs (job_key TEXT PRIMARY KEY, source TEXT, rows_done INTEGER NOT NULL DEFAULT 0, state TEXT, status TEXT NOT NULL DEFAULT 'running', stats TEXT, started_at DATETIME DEFAULT CURRENT_TIMESTAMP, updated_at DATETIME DEFAULT CURRENT_TIMESTAMP)"
+    ])
+    # Kolom hash konten untuk deduplikasi impor massal (database lama belum punya)
+    if "import_hash" not in {r[1] for r in conn.execute("PRAGMA table_info(transactions)").rows}:
+        conn.execute("ALTER TABLE transactions ADD COLUMN import_hash TEXT")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_import_hash ON transactions (import_hash) WHERE import_hash IS NOT NULL")
 
 def init_db():
-    with create_connection() as conn:
-        conn.batch([
-            "CREATE TABLE IF NOT EXISTS transactions (id INTEGER PRIMARY KEY, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP, asset TEXT, type TEXT, quantity REAL, price REAL)",
-            "CREATE TABLE IF NOT EXISTS portfolio_history (snapshot_date DATE PRIMARY KEY, total_value_usd REAL)",
-            "CREATE TABLE IF NOT EXISTS trading_journal (id INTEGER PRIMARY KEY, transaction_id INTEGER, entry_reason TEXT, exit_reason TEXT, lessons_learned TEXT, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP, FOREIGN KEY (transaction_id) REFERENCES transactions (id))",
-            "CREATE TABLE IF NOT EXISTS watched_wallets (id INTEGER PRIMARY KEY, address TEXT NOT NULL UNIQUE, label TEXT, chain TEXT DEFAULT 'Ethereum')"
-        ])
+    with connection() as conn:
+        _create_schema(conn)
+        # Holdings belum pernah diisi atau dihitung dengan aturan lama: bangun ulang dari ledger sekali saja
+        rs = conn.execute("SELECT value FROM ledger_totals WHERE name = 'holdings_version'")
+        if not rs.rows or rs.rows[0][0] < HOLDINGS_VERSION:
+            _write_holdings(conn, *_replay_ledger(conn))
 
-def add_transaction(asset, tr_type, quantity, price):
-    with create_connection() as conn:
-        conn.execute(
-            "INSERT INTO transactions (asset, type, quantity, price) VALUES (?, ?, ?, ?)",
-            (asset, tr_type, quantity, price)
+# --- HOLDINGS (materialized dari ledger, metode average cost) ---
+# SELL melebihi kuantitas yang dimiliki membuka posisi short di harga jual (cost_basis negatif, tanpa realized P/L);
+# BUY berikutnya menutup short dulu pada harga rata-ratanya, baru sisanya menambah posisi long.
+# Setiap ekspresi di SET membaca nilai baris sebelum update, jadi urutan kolom tidak berpengaruh.
+HOLDINGS_VERSION = 2  # naikkan jika aturan di bawah berubah agar init_db membangun ulang holdings
+_AVG_COST = "(CASE WHEN quantity != 0 THEN cost_basis / quantity ELSE 0 END)"
+_COVERED = "MIN(?2, MAX(-quantity, 0))"  # bagian BUY yang menutup short
+_MATCHED = "MIN(?2, MAX(quantity, 0))"   # bagian SELL yang menjual posisi long
+_HOLDINGS_BUY = (
+    "INSERT INTO holdings (asset, quantity, cost_basis) VALUES (?1, ?2, ?2 * ?3) ON CONFLICT(asset) DO UPDATE SET "
+    f"realized_pl = realized_pl + {_COVERED} * ({_AVG_COST} - ?3), "
+    f"cost_basis = cost_basis + {_COVERED} * {_AVG_COST} + (?2 - {_COVERED}) * ?3, "
+    "quantity = quantity + ?2"
+)
+_HOLDINGS_SELL = (
+    "INSERT INTO holdings (asset, quantity, cost_basis) VALUES (?1, -?2, -?2 * ?3) ON CONFLICT(asset) DO UPDATE SET "
+    f"realized_pl = realized_pl + {_MATCHED} * (?3 - {_AVG_COST}), "
+    f"cost_basis = cost_basis - {_MATCHED} * {_AVG_COST} - (?2 - {_MATCHED}) * ?3, "
+    "quantity = quantity - ?2"
+)
+_DEPOSITS_ADD = "INSERT INTO ledger_totals (name, value) VALUES ('deposits', ?1) ON CONFLICT(name) DO UPDATE SET value = value + ?1"
+
+def _holdings_statement(asset, tr_type, quantity, price):
+    if tr_type == 'BUY': return libsql_client.Statement(_HOLDINGS_BUY, (asset, quantity, price))
+    if tr_type == 'SELL': return libsql_client.Statement(_HOLDINGS_SELL, (asset, quantity, price))
+    if tr_type == 'DEPOSIT': return libsql_client.Statement(_DEPOSITS_ADD, (quantity,))
+    return None
+
+def _iter_ledger(conn, page_size=50_000):
+    """Baris (asset, type, quantity, price) secara kronologis per halaman keyset, agar memori tetap terbatas untuk ledger besar."""
+    yield from (r[2:] for r in conn.execute("SELECT timestamp, id, asset, type, quantity, price FROM transactions WHERE timestamp IS NULL ORDER BY id").rows)
+    cursor = None
+    while True:
+        rs = conn.execute(
+            "SELECT timestamp, id, asset, type, quantity, price FROM transactions WHERE timestamp IS NOT NULL"
+            + (" AND (timestamp, id) > (?, ?)" if cursor else "") + " ORDER BY timestamp, id LIMIT ?", [*(cursor or ()), page_size]
         )
+        yield from (r[2:] for r in rs.rows)
+        if len(rs.rows) < page_size: return
+        cursor = tuple(rs.rows[-1][:2])
+
+def _replay_ledger(conn):
+    """Menghitung ulang holdings & total deposit dari seluruh ledger (logika sama dengan statement incremental).
+
+    Urutan replay kronologis (timestamp, id), sehingga transaksi historis hasil impor dihitung pada waktunya.
+    """
+    holdings, deposits = {}, 0.0
+    for asset, tr_type, quantity, price in _iter_ledger(conn):
+        quantity, price = quantity or 0.0, price or 0.0
+        if tr_type == 'DEPOSIT': deposits += quantity; continue
+        if tr_type not in ('BUY', 'SELL'): continue
+        h = holdings.setdefault(asset, [0.0, 0.0, 0.0])
+        avg_cost = h[1] / h[0] if h[0] != 0 else 0
+        if tr_type == 'BUY':
+            covered = min(quantity, max(-h[0], 0))
+            h[2] += covered * (avg_cost - price); h[1] += covered * avg_cost + (quantity - covered) * price; h[0] += quantity
+        else:
+            matched = min(quantity, max(h[0], 0))
+            h[2] += matched * (price - avg_cost); h[1] -= matched * avg_cost + (quantity - matched) * price; h[0] -= quantity
+    return holdings, deposits
+
+def _write_holdings(conn, holdings, deposits):
+    conn.batch(
+        ["DELETE FROM holdings"]
+        + [libsql_client.Statement("INSERT INTO holdings (asset, quantity, cost_basis, realized_pl) VALUES (?, ?, ?, ?)", (a, *h)) for a, h in holdings.items()]
+        + [libsql_client.Statement("INSERT OR REPLACE INTO ledger_totals (name, value) VALUES ('deposits', ?)", (deposits,)),
+           libsql_client.Statement("INSERT OR REPLACE INTO ledger_totals (name, value) VALUES ('holdings_version', ?)", (HOLDINGS_VERSION,))]
+    )
+
+def rebuild_holdings(fix=True, tolerance=1e-9):
+    """Bandingkan tabel holdings dengan hasil replay ledger; kembalikan daftar drift dan (opsional) tulis ulang."""
+    with connection() as conn:
+        expected, deposits = _replay_ledger(conn)
+        stored = {r[0]: list(r[1:]) for r in conn.execute("SELECT asset, quantity, cost_basis, realized_pl FROM holdings").rows}
+        stored_deposits = _deposits_from_rs(conn.execute(TOTAL_DEPOSITS_QUERY))
+        drift = []
+        for asset in sorted(set(expected) | set(stored)):
+            exp, got = expected.get(asset, [0.0, 0.0, 0.0]), stored.get(asset, [0.0, 0.0, 0.0])
+            for field, e, g in zip(("quantity", "cost_basis", "realized_pl"), exp, got):
+                if abs(e - g) > tolerance: drift.append({"asset": asset, "field": field, "expected": e, "stored": g})
+        if abs(deposits - stored_deposits) > tolerance:
+            drift.append({"asset": "DEPOSIT", "field": "deposits", "expected": deposits, "stored": stored_deposits})
+        if fix and drift: _write_holdings(conn, expected, deposits)
+        return drift
+
+def add_transaction(asset, tr_type, quantity, price):
+    insert = libsql_client.Statement(
+        "INSERT INTO transactions (asset, type, quantity, price) VALUES (?, ?, ?, ?)",
+        (asset, tr_type, quantity, price)
+    )
+    holdings_update = _holdings_statement(asset, tr_type, quantity, price)
+    with connection() as conn:
+        # batch dijalankan dalam satu transaksi: ledger dan holdings selalu konsisten
+        conn.batch([insert, holdings_update] if holdings_update else [insert])
 
 def get_all_transactions():
-    with create_connection() as conn:
+    with connection() as conn:
         rs = conn.execute("SELECT * FROM transactions ORDER BY timestamp DESC")
         return pd.DataFrame(rs.rows, columns=rs.columns)
 
+# --- QUERY BERHALAMAN (keyset pada (timestamp, id), terbaru dulu) ---
+def _ledger_filters(prefix, asset=None, tr_type=None, start=None, end=None, date_column="timestamp"):
+    """Klausa WHERE + argumen untuk filter aset, tipe, dan rentang tanggal (inklusif, objek date)."""
+    clauses, args = [], []
+    if asset: clauses.append(f"{prefix}asset = ?"); args.append(asset)
+    if tr_type: clauses.append(f"{prefix}type = ?"); args.append(tr_type)
+    if start: clauses.append(f"{date_column} >= ?"); args.append(start.isoformat())
+    if end: clauses.append(f"{date_column} < ?"); args.append((end + timedelta(days=1)).isoformat())
+    return clauses, args
+
+def _page(conn, select, clauses, args, order_columns, cursor, limit):
+    """Jalankan query keyset: `cursor` adalah (timestamp, id) baris terakhir halaman sebelumnya."""
+    if cursor:
+        clauses = clauses + [f"({order_columns}) < (?, ?)"]; args = args + list(cursor)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    order = ", ".join(f"{c.strip()} DESC" for c in order_columns.split(","))
+    rs = conn.execute(f"{select}{where} ORDER BY {order} LIMIT ?", args + [limit + 1])
+    df = pd.DataFrame(rs.rows[:limit], columns=rs.columns)
+    if len(rs.rows) <= limit: return df, None
+    positions = [list(rs.columns).index(c.strip().split(".")[-1]) for c in order_columns.split(",")]
+    return df, tuple(rs.rows[limit - 1][i] for i in positions)
+
+def get_transactions_page(limit=50, cursor=None, asset=None, tr_type=None, start=None, end=None, search=None):
+    """Satu halaman transaksi terbaru yang cocok dengan filter; mengembalikan (DataFrame, kursor halaman berikutnya atau None).
+
+    `search` berupa angka dicocokkan ke ID transaksi, selain itu sebagai awalan nama aset.
+    """
+    clauses, args = _ledger_filters("", asset, tr_type, start, end)
+    search = (search or "").strip()
+    if search.isdigit(): clauses.append("id = ?"); args.append(int(search))
+    elif search: clauses.append("asset LIKE ?"); args.append(f"{search.upper()}%")
+    with connection() as conn:
+        return _page(conn, "SELECT id, timestamp, asset, type, quantity, price FROM transactions", clauses, args, "timestamp, id", cursor, limit)
+
+def get_journal_page(limit=20, cursor=None, asset=None, tr_type=None, start=None, end=None):
+    """Satu halaman entri jurnal terbaru (dengan detail transaksinya); mengembalikan (DataFrame, kursor berikutnya atau None)."""
+    clauses, args = _ledger_filters("t.", asset, tr_type, start, end, date_column="j.timestamp")
+    select = "SELECT j.id, j.timestamp, t.asset, t.type, t.quantity, t.price, j.entry_reason, j.exit_reason, j.lessons_learned FROM trading_journal j JOIN transactions t ON j.transaction_id = t.id"
+    with connection() as conn:
+        return _page(conn, select, clauses, args, "j.timestamp, j.id", cursor, limit)
+
+PORTFOLIO_SUMMARY_QUERY = "SELECT asset, quantity as total_quantity, cost_basis, realized_pl FROM holdings WHERE quantity > 0 ORDER BY asset"
+TOTAL_DEPOSITS_QUERY = "SELECT value FROM ledger_totals WHERE name = 'deposits'"
+PORTFOLIO_HISTORY_QUERY = "SELECT * FROM portfolio_history ORDER BY snapshot_date ASC"
+
 def get_portfolio_summary():
-    with create_connection() as conn:
-        query = "SELECT asset, SUM(CASE WHEN type = 'BUY' THEN quantity ELSE 0 END) - SUM(CASE WHEN type = 'SELL' THEN quantity ELSE 0 END) as total_quantity FROM transactions WHERE type IN ('BUY', 'SELL') GROUP BY asset HAVING total_quantity > 0;"
-        rs = conn.execute(query)
+    with connection() as conn:
+        rs = conn.execute(PORTFOLIO_SUMMARY_QUERY)
         return pd.DataFrame(rs.rows, columns=rs.columns)
 
+def _deposits_from_rs(rs):
+    return (rs.rows[0][0] or 0.0) if rs.rows else 0.0
+
 def get_total_deposits():
-    with create_connection() as conn:
-        rs = conn.execute("SELECT SUM(quantity) FROM transactions WHERE type = 'DEPOSIT'")
-        return rs.rows[0][0] if rs.rows else 0.0
+    with connection() as conn:
+        return _deposits_from_rs(conn.execute(TOTAL_DEPOSITS_QUERY))
 
 def add_portfolio_snapshot(value):
     today = date.today().isoformat()
-    with create_connection() as conn:
+    with connection() as conn:
         conn.execute(
             "INSERT OR IGNORE INTO portfolio_history (snapshot_date, total_value_usd) VALUES (?, ?)",
             (today, value)
         )
 
+def get_ledger_movements():
+    """Mutasi kuantitas per transaksi BUY/SELL (untuk backfill riwayat nilai portofolio)."""
+    with connection() as conn:
+        rs = conn.execute("SELECT timestamp, asset, CASE WHEN type = 'BUY' THEN quantity ELSE -quantity END AS quantity FROM transactions WHERE type IN ('BUY', 'SELL') ORDER BY timestamp")
+        return pd.DataFrame(rs.rows, columns=rs.columns)
+
+def upsert_portfolio_history(rows, chunk_size=200):
+    """Bulk upsert (tanggal ISO, nilai USD) ke portfolio_history dengan INSERT multi-baris dalam satu batch."""
+    stmts = []
+    for i in range(0, len(rows), chunk_size):
+        chunk = rows[i:i + chunk_size]
+        stmts.append(libsql_client.Statement(
+            "INSERT INTO portfolio_history (snapshot_date, total_value_usd) VALUES " + ", ".join(["(?, ?)"] * len(chunk))
+            + " ON CONFLICT(snapshot_date) DO UPDATE SET total_value_usd = excluded.total_value_usd",
+            [v for row in chunk for v in row]
+        ))
+    if not stmts: return
+    with connection() as conn:
+        conn.batch(stmts)
+
+def _history_from_rs(rs):
+    df = pd.DataFrame(rs.rows, columns=rs.columns)
+    if not df.empty:
+        df['snapshot_date'] = pd.to_datetime(df['snapshot_date'])
+        df = df.set_index('snapshot_date')
+    return df
+
 def get_portfolio_history():
-    with create_connection() as conn:
-        rs = conn.execute("SELECT * FROM portfolio_history ORDER BY snapshot_date ASC")
-        df = pd.DataFrame(rs.rows, columns=rs.columns)
-        if not df.empty:
-            df['snapshot_date'] = pd.to_datetime(df['snapshot_date'])
-            df = df.set_index('snapshot_date')
-        return df
+    with connection() as conn:
+        return _history_from_rs(conn.execute(PORTFOLIO_HISTORY_QUERY))
+
+def get_dashboard_snapshot():
+    """Ringkasan portofolio, total deposit, dan riwayat nilai dalam satu round trip `batch`."""
+    with connection() as conn:
+        summary_rs, deposits_rs, history_rs = conn.batch([PORTFOLIO_SUMMARY_QUERY, TOTAL_DEPOSITS_QUERY, PORTFOLIO_HISTORY_QUERY])
+        return pd.DataFrame(summary_rs.rows, columns=summary_rs.columns), _deposits_from_rs(deposits_rs), _history_from_rs(history_rs)
 
 def add_journal_entry(transaction_id, entry_reason, exit_reason, lessons_learned):
-    with create_connection() as conn:
+    with connection() as conn:
         conn.execute(
             "INSERT INTO trading_journal (transaction_id, entry_reason, exit_reason, lessons_learned) VALUES (?, ?, ?, ?)",
             (transaction_id, entry_reason, exit_reason, lessons_learned)
         )
 
 def get_journal_entries():
-    with create_connection() as conn:
+    with connection() as conn:
         query = "SELECT j.id, j.timestamp, t.asset, t.type, t.quantity, t.price, j.entry_reason, j.exit_reason, j.lessons_learned FROM trading_journal j JOIN transactions t ON j.transaction_id = t.id ORDER BY j.timestamp DESC"
         rs = conn.execute(query)
         return pd.DataFrame(rs.rows, columns=rs.columns)
 
 def add_watched_wallet(address, label):
-    with create_connection() as conn:
+    with connection() as conn:
         conn.execute("INSERT OR IGNORE INTO watched_wallets (address, label) VALUES (?, ?)", (address, label))
 
 def get_watched_wallets():
-    with create_connection() as conn:
+    with connection() as conn:
         rs = conn.execute("SELECT * FROM watched_wallets ORDER BY label ASC")
         return pd.DataFrame(rs.rows, columns=rs.columns)
 
 def remove_watched_wallet(wallet_id):
-    with create_connection() as conn:
-        conn.execute("DELETE FROM watched_wallets WHERE id = ?", (wallet_id,))
\ No newline at end of file
+    with connection() as conn:
+        conn.batch([
+            libsql_client.Statement(f"DELETE FROM {table} WHERE wallet_address = (SELECT lower(address) FROM watched_wallets WHERE id = ?)", (wallet_id,))
+            for table in ("whale_transfers", "wallet_sync_state")
+        ] + [libsql_client.Statement("DELETE FROM watched_wallets WHERE id = ?", (wallet_id,))])
+
+# --- WHALE WATCHER (transfer tersimpan + cursor startblock per wallet) ---
+_WHALE_COLUMNS = ("block_number", "time_stamp", "hash", "contract_address", "from_address", "to_address", "value", "token_symbol", "token_decimal")
+_WHALE_INSERT_CHUNK = 50
+
+def get_wallet_cursors():
+    with connection() as conn:
+        return {r[0]: r[1] for r in conn.execute("SELECT wallet_address, start_block FROM wallet_sync_state").rows}
+
+def save_whale_transfers(wallet_address, transfers, start_block):
+    """Simpan transfer (tuple sesuai _WHALE_COLUMNS) dan majukan cursor wallet dalam satu transaksi."""
+    wallet_address = wallet_address.lower()
+    stmts = []
+    for i in range(0, len(transfers), _WHALE_INSERT_CHUNK):
+        chunk = transfers[i:i + _WHALE_INSERT_CHUNK]
+        placeholders = ", ".join(["(" + ", ".join("?" * (len(_WHALE_COLUMNS) + 1)) + ")"] * len(chunk))
+        stmts.append(libsql_client.Statement(
+            f"INSERT OR IGNORE INTO whale_transfers (wallet_address, {', '.join(_WHALE_COLUMNS)}) VALUES {placeholders}",
+            [v for row in chunk for v in (wallet_address, *row)]
+        ))
+    stmts.append(libsql_client.Statement(
+        "INSERT INTO wallet_sync_state (wallet_address, start_block, last_synced) VALUES (?1, ?2, CURRENT_TIMESTAMP) ON CONFLICT(wallet_address) DO UPDATE SET start_block = MAX(start_block, ?2), last_synced = CURRENT_TIMESTAMP",
+        (wallet_address, start_block)
+    ))
+    with connection() as conn:
+        conn.batch(stmts)
+
+def get_whale_transfers(wallet_address, limit=25):
+    """Transfer terbaru yang tersimpan, dengan nama kolom mentah Etherscan (untuk normalisasi)."""
+    with connection() as conn:
+        rs = conn.execute(
+            "SELECT time_stamp AS timeStamp, hash, contract_address AS contractAddress, from_address AS \"from\", to_address AS \"to\", value, token_symbol AS tokenSymbol, token_decimal AS tokenDecimal FROM whale_transfers WHERE wallet_address = ? ORDER BY time_stamp DESC LIMIT ?",
+            (wallet_address.lower(), limit)
+        )
+        return pd.DataFrame(rs.rows, columns=rs.columns)
+
+# --- PRICE ALERTS ---
+def add_price_alert(asset, condition, price):
+    with connection() as conn:
+        conn.execute("INSERT INTO price_alerts (asset, condition, price) VALUES (?, ?, ?)", (asset, condition, price))
+
+def get_active_price_alerts():
+    with connection() as conn:
+        rs = conn.execute("SELECT id, asset, condition, price FROM price_alerts WHERE triggered_at IS NULL ORDER BY asset, price")
+        return pd.DataFrame(rs.rows, columns=rs.columns)
+
+def remove_price_alert(alert_id):
+    with connection() as conn:
+        conn.execute("DELETE FROM price_alerts WHERE id = ?", (alert_id,))
+
+def mark_alerts_triggered(fired):
+    """fired: list (alert_id, harga_pemicu). Hanya alert yang belum terpicu yang diubah."""
+    if not fired: return
+    with connection() as conn:
+        conn.batch([
+            libsql_client.Statement("UPDATE price_alerts SET triggered_at = CURRENT_TIMESTAMP, triggered_price = ? WHERE id = ? AND triggered_at IS NULL", (price, alert_id))
+            for alert_id, price in fired
+        ])
+
+def pop_triggered_alerts():
+    """Alert yang sudah terpicu tapi belum ditampilkan; langsung ditandai sudah dibaca."""
+    with connection() as conn:
+        rs_select, _ = conn.batch([
+            "SELECT id, asset, condition, price, triggered_price, triggered_at FROM price_alerts WHERE triggered_at IS NOT NULL AND acknowledged = 0 ORDER BY triggered_at",
+            "UPDATE price_alerts SET acknowledged = 1 WHERE triggered_at IS NOT NULL AND acknowledged = 0"
+        ])
+        return pd.DataFrame(rs_select.rows, columns=rs_select.columns)
+
+# --- CACHE BRIEFING AI ---
+def get_cached_briefing(cache_key):
+    with connection() as conn:
+        rs, _ = conn.batch([
+            libsql_client.Statement("SELECT response FROM ai_briefings WHERE cache_key = ?", (cache_key,)),
+            libsql_client.Statement("UPDATE ai_briefings SET last_used = CURRENT_TIMESTAMP WHERE cache_key = ?", (cache_key,))
+        ])
+        return rs.rows[0][0] if rs.rows else None
+
+def save_briefing(cache_key, topic, briefing_date, prompt_version, response, max_entries=200, max_age_days=30):
+    """Simpan briefing lalu buang entri yang lebih tua dari `max_age_days` atau di luar `max_entries` terbaru dipakai."""
+    with connection() as conn:
+        conn.batch([
+            libsql_client.Statement(
+                "INSERT OR REPLACE INTO ai_briefings (cache_key, topic, briefing_date, prompt_version, response) VALUES (?, ?, ?, ?, ?)",
+                (cache_key, topic, briefing_date, prompt_version, response)
+            ),
+            libsql_client.Statement("DELETE FROM ai_briefings WHERE created_at < datetime('now', ?)", (f"-{int(max_age_days)} days",)),
+            libsql_client.Statement("DELETE FROM ai_briefings WHERE cache_key NOT IN (SELECT cache_key FROM ai_briefings ORDER BY last_used DESC LIMIT ?)", (max_entries,))
+        ])
+
+# --- IMPOR MASSAL (checkpoint per chunk untuk resume) ---
+def get_import_job(job_key):
+    with connection() as conn:
+        rs = conn.execute("SELECT job_key, source, rows_done, status, stats, updated_at FROM import_jobs WHERE job_key = ?", (job_key,))
+        return dict(zip(rs.columns, rs.rows[0])) if rs.rows else None
+
+def start_import_job(job_key, source, restart=False):
+    """Daftarkan job impor; job yang sudah ada dilanjutkan dari checkpoint-nya kecuali `restart`. Mengembalikan (rows_done, state)."""
+    with connection() as conn:
+        conn.execute(
+            "INSERT INTO import_jobs (job_key, source) VALUES (?, ?) ON CONFLICT(job_key) DO UPDATE SET status = 'running', updated_at = CURRENT_TIMESTAMP"
+            + (", rows_done = 0, state = NULL, stats = NULL" if restart else ""), (job_key, source)
+        )
+        return tuple(conn.execute("SELECT rows_done, state FROM import_jobs WHERE job_key = ?", (job_key,)).rows[0])
+
+def import_transactions_chunk(job_key, rows, rows_done, state=None, chunk_size=200):
+    """Tulis (timestamp, asset, type, quantity, price, import_hash) dengan INSERT multi-baris + checkpoint job dalam satu batch
+    (satu transaksi), sehingga checkpoint tidak pernah mendahului data. Baris dengan hash yang sudah ada diabaikan.
+    Mengembalikan jumlah baris yang benar-benar ditambahkan."""
+    stmts = [libsql_client.Statement(
+        "INSERT OR IGNORE INTO transactions (timestamp, asset, type, quantity, price, import_hash) VALUES " + ", ".join(["(?, ?, ?, ?, ?, ?)"] * len(chunk)),
+        [v for row in chunk for v in row]
+    ) for chunk in (rows[i:i + chunk_size] for i in range(0, len(rows), chunk_size))]
+    stmts.append(libsql_client.Statement("UPDATE import_jobs SET rows_done = ?, state = ?, updated_at = CURRENT_TIMESTAMP WHERE job_key = ?", (rows_done, state, job_key)))
+    with connection() as conn:
+        return sum(rs.rows_affected for rs in conn.batch(stmts)[:-1])
+
+def finish_import_job(job_key, status, stats):
+    with connection() as conn:
+        conn.execute("UPDATE import_jobs SET status = ?, stats = ?, updated_at = CURRENT_TIMESTAMP WHERE job_key = ?", (status, stats, job_key))
+
+# --- REPLIKA LOKAL (TURSO_REPLICA_PATH) ---
+def get_sync_status():
+    """Status sinkron replika (perubahan tertunda, lag dorong/tarik, konflik); {"mode": "remote"} tanpa replika."""
+    client = get_client()
+    return client.status() if isinstance(client, ReplicaClient) else {"mode": "remote"}
+
+def get_sync_conflicts(limit=50):
+    """Baris lokal yang ditolak primary (primary menang), terbaru dulu."""
+    if not isinstance(get_client(), ReplicaClient): return pd.DataFrame()
+    with connection() as conn:
+        rs = conn.execute("SELECT id, created_at, tbl, op, pk, local_row, error FROM _sync_conflicts ORDER BY id DESC LIMIT ?", (limit,))
+        return pd.DataFrame(rs.rows, columns=rs.columns)
+
+def sync_replica(pull=True):
+    """Sinkronkan replika sekarang juga (tanpa menunggu worker); no-op tanpa replika."""
+    client = get_client()
+    if isinstance(client, ReplicaClient): client.sync(pull=pull)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Utilitas database Pandu Terminal.")
+    parser.add_argument("command", choices=["verify-holdings", "rebuild-holdings", "sync-replica"])
+    args = parser.parse_args()
+    if args.command == "sync-replica":
+        sync_replica(); print(get_sync_status()); close_client(); raise SystemExit
+    drift = rebuild_holdings(fix=args.command == "rebuild-holdings")
+    for d in drift: print(f"{d['asset']:>10} {d['field']:<12} ledger={d['expected']:.10g} holdings={d['stored']:.10g}")
+    print("Holdings konsisten dengan ledger." if not drift else f"{len(drift)} drift ditemukan" + (" dan diperbaiki." if args.command == "rebuild-holdings" else "."))
+    close_client()
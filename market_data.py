@@ -1,31 +1,127 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 import requests
-import yfinance as yf
+import perf
+from price_service import get_price, FX_SYMBOL
+from ohlcv_store import get_closes
+
+FNG_URL = "https://api.alternative.me/fng/?limit=1"
+COINGECKO_GLOBAL_URL = "https://api.coingecko.com/api/v3/global"
+HTTP_TIMEOUT = 5
+
+def _fetch_fear_and_greed(timeout=HTTP_TIMEOUT):
+    response = requests.get(FNG_URL, timeout=timeout)
+    response.raise_for_status()
+    data = response.json()['data'][0]
+    return f"{int(data['value'])} ({data['value_classification']})"
+
+def _fetch_btc_dominance(timeout=HTTP_TIMEOUT):
+    response = requests.get(COINGECKO_GLOBAL_URL, timeout=timeout)
+    response.raise_for_status()
+    dominance = response.json()['data']['market_cap_percentage']['btc']
+    return f"{dominance:.2f}%"
+
+def _fetch_regime_inputs(ticker="BTC-USD"):
+    """Harga terakhir dan SMA 200 hari dari cache bar harian lokal."""
+    closes = get_closes([ticker], 250)[ticker].dropna()
+    sma_200 = closes.rolling(window=200).mean().iloc[-1]
+    if sma_200 != sma_200: raise ValueError("Data kurang dari 200 hari.")
+    return float(closes.iloc[-1]), float(sma_200)
 
 def get_fear_and_greed_index():
     try:
-        response = requests.get("https://api.alternative.me/fng/?limit=1")
-        response.raise_for_status()
-        data = response.json()['data'][0]
-        return f"{int(data['value'])} ({data['value_classification']})"
+        return _fetch_fear_and_greed()
     except requests.exceptions.RequestException:
         return "N/A"
 
 def get_btc_dominance():
     try:
-        response = requests.get("https://api.coingecko.com/api/v3/global")
-        response.raise_for_status()
-        dominance = response.json()['data']['market_cap_percentage']['btc']
-        return f"{dominance:.2f}%"
+        return _fetch_btc_dominance()
     except requests.exceptions.RequestException:
         return "N/A"
 
+def format_market_regime(current_price, sma_200, war_mode):
+    if current_price > sma_200:
+        reason = f"Pasukan utama (${current_price:,.2f}) memimpin di depan garis logistik (${sma_200:,.2f})." if war_mode else f"Harga BTC (${current_price:,.2f}) di atas SMA 200 (${sma_200:,.2f})."
+        regime = "Cerah (Risk-On)" if war_mode else "Bullish (Risk-On)"
+    else:
+        reason = f"Pasukan utama (${current_price:,.2f}) tertinggal dari garis logistik (${sma_200:,.2f})." if war_mode else f"Harga BTC (${current_price:,.2f}) di bawah SMA 200 (${sma_200:,.2f})."
+        regime = "Badai (Risk-Off)" if war_mode else "Bearish (Risk-Off)"
+    return regime, reason
+
+def diagnose_market_regime(war_mode, ticker="BTC-USD"):
+    try:
+        return format_market_regime(*_fetch_regime_inputs(ticker), war_mode)
+    except Exception:
+        return "Error", "Gagal menganalisis."
+
 # --- FUNGSI BARU UNTUK KURS USD/IDR ---
 def get_usd_to_idr_rate():
-    """Mengambil kurs USD ke IDR terbaru dari Yahoo Finance."""
+    """Mengambil kurs USD ke IDR terbaru dari Yahoo Finance (lewat cache price_service)."""
+    rate = get_price(FX_SYMBOL)
+    return rate if rate else 16200.0
+
+# --- SNAPSHOT KESEHATAN PASAR (paralel + cache per sumber) ---
+# nama -> (fungsi fetch, TTL detik, batas tunggu detik saat belum ada nilai cache)
+MARKET_SOURCES = {
+    "fng": (_fetch_fear_and_greed, 6 * 3600, HTTP_TIMEOUT),
+    "btc_dominance": (_fetch_btc_dominance, 300, HTTP_TIMEOUT),
+    "regime": (_fetch_regime_inputs, 900, 15),
+}
+
+_executor = ThreadPoolExecutor(max_workers=len(MARKET_SOURCES), thread_name_prefix="market_data")
+_snapshot_cache = {}  # nama -> {"value", "fetched_at", "latency", "error"}
+_inflight = {}        # nama -> Future yang sedang berjalan
+_snapshot_lock = threading.Lock()
+
+def _run_source(name):
+    fetch = MARKET_SOURCES[name][0]
+    start = time.monotonic()
     try:
-        ticker = yf.Ticker("IDR=X")
-        rate = ticker.history(period='1d')['Close'].iloc[-1]
-        return rate
-    except Exception:
-        
-        return 16200.0
\ No newline at end of file
+        with perf.span(f"market.{name}"): value, error = fetch(), None
+    except Exception as e:
+        value, error = None, str(e)
+    latency = time.monotonic() - start
+    with _snapshot_lock:
+        previous = _snapshot_cache.get(name)
+        if error is None or previous is None or previous["value"] is None:
+            _snapshot_cache[name] = {"value": value, "fetched_at": time.time(), "latency": latency, "error": error}
+        else:
+            # Gagal refresh: pertahankan nilai terakhir yang valid, catat error-nya saja
+            previous.update(latency=latency, error=error)
+        _inflight.pop(name, None)
+
+def _refresh(name):
+    """Jadwalkan fetch di thread pool kecuali sudah ada yang berjalan; kembalikan Future-nya."""
+    with _snapshot_lock:
+        future = _inflight.get(name)
+        if future is None:
+            future = _inflight[name] = _executor.submit(perf.bind(_run_source), name)
+        return future
+
+@perf.traced("market.snapshot")
+def get_market_snapshot():
+    """Nilai semua sumber pasar: yang masih segar dari cache, yang kedaluwarsa dikembalikan apa adanya
+    sambil disegarkan di background, dan yang belum pernah ada diambil paralel dengan timeout per sumber.
+
+    Hasil: {nama: {"value", "age" (detik, None jika belum ada), "latency", "stale", "error"}}.
+    """
+    now, waiting = time.time(), {}
+    for name, (_, ttl, timeout) in MARKET_SOURCES.items():
+        with _snapshot_lock: entry = _snapshot_cache.get(name)
+        if entry is None: waiting[name] = (_refresh(name), timeout)
+        elif now - entry["fetched_at"] >= ttl or entry["error"] and entry["value"] is None: _refresh(name)
+    start = time.monotonic()
+    for future, timeout in waiting.values():
+        wait([future], timeout=max(0.0, start + timeout - time.monotonic()))
+    snapshot, now = {}, time.time()
+    with _snapshot_lock:
+        for name, (_, ttl, _) in MARKET_SOURCES.items():
+            entry = _snapshot_cache.get(name)
+            if entry is None:
+                snapshot[name] = {"value": None, "age": None, "latency": None, "stale": True, "error": "timeout"}
+            else:
+                age = now - entry["fetched_at"]
+                snapshot[name] = {"value": entry["value"], "age": age, "latency": entry["latency"], "stale": age >= ttl or entry["value"] is None, "error": entry["error"]}
+    return snapshot
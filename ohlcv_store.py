@@ -0,0 +1,97 @@
+import os
+import time
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import date, timedelta
+import pandas as pd
+import yfinance as yf
+import perf
+
+# Cache lokal bar harian (OHLCV). Hanya hari yang belum ada yang diunduh; jika offline, data lama tetap dipakai.
+OHLCV_DB_PATH = os.getenv("OHLCV_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "ohlcv_cache.db"))
+# Jeda minimum (detik) antar sinkronisasi untuk simbol yang sama
+SYNC_INTERVAL = float(os.getenv("OHLCV_SYNC_INTERVAL", "900"))
+
+_last_sync = {}  # simbol -> (waktu sinkronisasi terakhir (monotonic), tanggal paling awal yang sudah diminta)
+_sync_lock = threading.Lock()
+
+def _connect():
+    conn = sqlite3.connect(OHLCV_DB_PATH, timeout=30)
+    conn.execute("CREATE TABLE IF NOT EXISTS daily_bars (symbol TEXT NOT NULL, bar_date TEXT NOT NULL, open REAL, high REAL, low REAL, close REAL, volume REAL, PRIMARY KEY (symbol, bar_date)) WITHOUT ROWID")
+    return conn
+
+def _coverage(conn, symbols):
+    rows = conn.execute(f"SELECT symbol, MIN(bar_date), MAX(bar_date) FROM daily_bars WHERE symbol IN ({','.join('?' * len(symbols))}) GROUP BY symbol", symbols).fetchall()
+    return {s: (date.fromisoformat(lo), date.fromisoformat(hi)) for s, lo, hi in rows}
+
+def _frame_for(data, symbol):
+    if isinstance(data.columns, pd.MultiIndex):
+        if symbol not in data.columns.get_level_values(1): return None
+        data = data.xs(symbol, axis=1, level=1)
+    return data.dropna(subset=["Close"])
+
+def _store_bars(conn, symbols, data):
+    rows = []
+    for symbol in symbols:
+        bars = _frame_for(data, symbol)
+        if bars is None or bars.empty: continue
+        dates = pd.to_datetime(bars.index).strftime("%Y-%m-%d")
+        rows += zip([symbol] * len(bars), dates, bars["Open"], bars["High"], bars["Low"], bars["Close"], bars["Volume"])
+    conn.executemany("INSERT OR REPLACE INTO daily_bars (symbol, bar_date, open, high, low, close, volume) VALUES (?, ?, ?, ?, ?, ?, ?)", [tuple(None if v != v else v for v in r) for r in rows])
+    conn.commit()
+
+def sync(symbols, lookback_days):
+    """Lengkapi cache untuk `lookback_days` hari terakhir; hanya rentang yang hilang yang diunduh."""
+    now, required = time.monotonic(), date.today() - timedelta(days=lookback_days + 10)
+    with _sync_lock:
+        # Rentang yang lebih panjang dari sinkronisasi terakhir tetap diunduh walau belum lewat SYNC_INTERVAL
+        due = [s for s in symbols if s not in _last_sync or now - _last_sync[s][0] >= SYNC_INTERVAL or required < _last_sync[s][1]]
+        if not due: return
+        with closing(_connect()) as conn:
+            coverage = _coverage(conn, due)
+            starts = {}
+            for symbol in due:
+                lo, hi = coverage.get(symbol, (None, None))
+                # Bar terakhir ikut diunduh ulang karena bar hari ini belum final
+                start = required if lo is None or lo > required else hi
+                starts.setdefault(start, []).append(symbol)
+            for start, group in starts.items():
+                try:
+                    with perf.span("yfinance.download", symbols=len(group), start=start.isoformat()):
+                        data = yf.download(group, start=start.isoformat(), interval="1d", progress=False, auto_adjust=False, threads=True)
+                except Exception:
+                    continue
+                if data is not None and not data.empty: _store_bars(conn, group, data)
+        for symbol in due: _last_sync[symbol] = (now, min(required, _last_sync.get(symbol, (now, required))[1]))
+
+def get_closes(symbols, days, sync_first=True):
+    """DataFrame harga close (index tanggal, kolom simbol) untuk `days` bar terakhir yang tersedia."""
+    if sync_first: sync(symbols, days)
+    with closing(_connect()) as conn:
+        coverage = _coverage(conn, symbols)
+        if not coverage: return pd.DataFrame(columns=symbols)
+        # Jendela dihitung dari bar terakhir yang tersimpan, bukan dari hari ini, supaya tetap jalan saat offline
+        since = max(hi for _, hi in coverage.values()) - timedelta(days=days + 10)
+        df = pd.read_sql_query(
+            f"SELECT symbol, bar_date, close FROM daily_bars WHERE symbol IN ({','.join('?' * len(symbols))}) AND bar_date >= ? ORDER BY bar_date",
+            conn, params=[*symbols, since.isoformat()]
+        )
+    closes = df.pivot(index="bar_date", columns="symbol", values="close").reindex(columns=symbols)
+    closes.index = pd.to_datetime(closes.index)
+    return closes.iloc[-days:]
+
+def get_close_matrix(symbols, start, end, sync_first=True):
+    """Matriks close harian (tanggal x simbol) untuk rentang [start, end], di-forward-fill ke setiap hari kalender."""
+    if sync_first: sync(symbols, (date.today() - start).days + 1)
+    with closing(_connect()) as conn:
+        df = pd.read_sql_query(
+            f"SELECT symbol, bar_date, close FROM daily_bars WHERE symbol IN ({','.join('?' * len(symbols))}) AND bar_date <= ? ORDER BY bar_date",
+            conn, params=[*symbols, end.isoformat()]
+        )
+    days = pd.date_range(start, end, freq="D")
+    if df.empty: return pd.DataFrame(index=days, columns=symbols, dtype=float)
+    closes = df.pivot(index="bar_date", columns="symbol", values="close").reindex(columns=symbols)
+    closes.index = pd.to_datetime(closes.index)
+    # Bar sebelum `start` ikut dibaca supaya hari pertama rentang tetap punya harga terakhir yang diketahui
+    return closes.reindex(closes.index.union(days)).ffill().reindex(days)
@@ -0,0 +1,152 @@
+"""Instrumentasi ringan untuk jalur panas: span waktu dan counter per rerun Streamlit.
+
+Tracing hanya aktif di antara start_trace() dan end_trace() (per thread/konteks). Di luar itu span() dan
+@traced hanya membaca satu ContextVar lalu langsung memanggil fungsi aslinya, jadi praktis tanpa overhead.
+Jika PERF_TRACE_FILE di-set, setiap trace yang selesai ditulis sebagai satu baris JSON ke file berotasi.
+"""
+import os
+import json
+import time
+import threading
+import functools
+import contextvars
+from datetime import datetime
+
+TRACE_FILE = os.getenv("PERF_TRACE_FILE", "")
+TRACE_FILE_MAX_BYTES = int(os.getenv("PERF_TRACE_MAX_BYTES", str(5 * 1024 * 1024)))
+TRACE_FILE_BACKUPS = int(os.getenv("PERF_TRACE_BACKUPS", "3"))
+
+_current = contextvars.ContextVar("perf_trace", default=None)
+_parent = contextvars.ContextVar("perf_span_depth", default=0)
+_writer = None
+_writer_lock = threading.Lock()
+
+class Trace:
+    def __init__(self, name, **attrs):
+        self.name, self.attrs = name, attrs
+        self.started_at, self._t0 = datetime.now().isoformat(timespec="milliseconds"), time.perf_counter()
+        self.duration_ms = None
+        self.spans, self.counters = [], {}
+        self._lock = threading.Lock()
+
+    def to_dict(self):
+        with self._lock: spans, counters = sorted(self.spans, key=lambda s: s["start_ms"]), dict(self.counters)
+        return {"ts": self.started_at, "name": self.name, **self.attrs, "duration_ms": self.duration_ms, "spans": spans, "counters": counters}
+
+class _Span:
+    __slots__ = ("trace", "name", "attrs", "start", "token")
+
+    def __init__(self, trace, name, attrs):
+        self.trace, self.name, self.attrs = trace, name, attrs
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.token = _parent.set(_parent.get() + 1)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        _parent.reset(self.token)
+        record(self.name, self.start, end, depth=_parent.get(), trace=self.trace, error=exc_type.__name__ if exc_type else None, **self.attrs)
+        return False
+
+class _NullSpan:
+    __slots__ = ()
+    def set(self, **attrs): pass
+    def __enter__(self): return self
+    def __exit__(self, exc_type, exc, tb): return False
+
+_NULL_SPAN = _NullSpan()
+
+def active():
+    return _current.get() is not None
+
+def start_trace(name="rerun", **attrs):
+    """Mulai trace baru untuk konteks ini (trace sebelumnya yang tidak ditutup dibuang)."""
+    trace = Trace(name, **attrs)
+    _current.set(trace); _parent.set(0)
+    return trace
+
+def end_trace():
+    """Tutup trace aktif, tulis ke file trace (jika dikonfigurasi), dan kembalikan Trace-nya (None jika tidak ada)."""
+    trace = _current.get()
+    if trace is None: return None
+    _current.set(None)
+    trace.duration_ms = (time.perf_counter() - trace._t0) * 1000
+    if TRACE_FILE: _write(trace)
+    return trace
+
+def annotate(**attrs):
+    trace = _current.get()
+    if trace is not None: trace.attrs.update(attrs)
+
+def span(name, **attrs):
+    """Context manager pengukur waktu; no-op jika tidak ada trace aktif."""
+    trace = _current.get()
+    return _NULL_SPAN if trace is None else _Span(trace, name, attrs)
+
+def record(name, start, end, depth=None, trace=None, error=None, **attrs):
+    """Catat span dari dua nilai time.perf_counter() (untuk durasi yang tidak bisa dibungkus `with`, mis. generator)."""
+    trace = trace or _current.get()
+    if trace is None: return
+    entry = {"name": name, "start_ms": (start - trace._t0) * 1000, "duration_ms": (end - start) * 1000,
+             "depth": _parent.get() if depth is None else depth, "thread": threading.current_thread().name}
+    if error: entry["error"] = error
+    if attrs: entry["attrs"] = attrs
+    with trace._lock:
+        trace.spans.append(entry)
+        trace.counters[f"{name}.calls"] = trace.counters.get(f"{name}.calls", 0) + 1
+
+def count(name, n=1):
+    trace = _current.get()
+    if trace is None: return
+    with trace._lock: trace.counters[name] = trace.counters.get(name, 0) + n
+
+def traced(name):
+    """Dekorator: bungkus pemanggilan fungsi dalam span `name` bila ada trace aktif."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            trace = _current.get()
+            if trace is None: return fn(*args, **kwargs)
+            with _Span(trace, name, {}): return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def bind(fn):
+    """Bungkus `fn` agar berjalan dalam konteks trace saat ini (untuk thread pool / thread lain)."""
+    if _current.get() is None: return fn
+    return functools.partial(contextvars.copy_context().run, fn)
+
+# --- FILE TRACE (JSONL berotasi) ---
+def _write(trace):
+    global _writer
+    line = json.dumps(trace.to_dict(), default=str)
+    with _writer_lock:
+        try:
+            if _writer is None:
+                import logging
+                from logging.handlers import RotatingFileHandler
+                _writer = logging.getLogger("pandu.perf")
+                _writer.propagate = False
+                handler = RotatingFileHandler(TRACE_FILE, maxBytes=TRACE_FILE_MAX_BYTES, backupCount=TRACE_FILE_BACKUPS, encoding="utf-8")
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                _writer.addHandler(handler); _writer.setLevel(logging.INFO)
+            _writer.info(line)
+        except OSError:
+            pass  # trace hanya alat bantu; jangan ganggu aplikasi
+
+def summarize(trace):
+    """Agregat per nama span: jumlah panggilan, total dan maksimum durasi (ms), urut dari total terbesar."""
+    rows = {}
+    for s in trace.to_dict()["spans"]:
+        r = rows.setdefault(s["name"], {"span": s["name"], "calls": 0, "total_ms": 0.0, "max_ms": 0.0})
+        r["calls"] += 1; r["total_ms"] += s["duration_ms"]; r["max_ms"] = max(r["max_ms"], s["duration_ms"])
+    return sorted(rows.values(), key=lambda r: -r["total_ms"])
+
+def load_traces(path=None):
+    """Baca file trace JSONL (mis. untuk analisis offline dengan pandas.json_normalize)."""
+    with open(path or TRACE_FILE, encoding="utf-8") as f: return [json.loads(line) for line in f if line.strip()]
@@ -0,0 +1,83 @@
+"""Backfill riwayat nilai portofolio harian dari ledger transaksi.
+
+Jalankan: python portfolio_backfill.py [--start YYYY-MM-DD] [--end YYYY-MM-DD] [--offline]
+"""
+import time
+import argparse
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from database import get_ledger_movements, upsert_portfolio_history, close_client
+from ohlcv_store import get_close_matrix
+
+def holdings_matrix(movements, start, end):
+    """Matriks kuantitas kumulatif (hari x aset) pada akhir setiap hari dalam [start, end]."""
+    days = pd.date_range(start, end, freq="D")
+    if movements.empty: return pd.DataFrame(index=days, dtype=float)
+    day = pd.to_datetime(movements["timestamp"]).dt.normalize()
+    daily = movements.assign(day=day).pivot_table(index="day", columns="asset", values="quantity", aggfunc="sum", fill_value=0.0)
+    # Mutasi sebelum `start` tetap dihitung: cumsum di atas semua hari, lalu potong ke rentang yang diminta
+    all_days = pd.date_range(min(daily.index.min(), days[0]), days[-1], freq="D")
+    return daily.reindex(all_days, fill_value=0.0).cumsum().reindex(days)
+
+def _date_ranges(days, mask):
+    """Rentang tanggal berurutan [(awal, akhir)] tempat `mask` bernilai True."""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.astype(int), [0]))))
+    return [(days[a].date().isoformat(), days[b - 1].date().isoformat()) for a, b in zip(edges[::2], edges[1::2])]
+
+def compute_portfolio_history(movements, prices):
+    """Nilai portofolio harian = sum(kuantitas x harga close), dalam satu operasi matriks.
+
+    `prices` berindeks sama dengan matriks kuantitas dan berkolom '<ASET>-USD'.
+    Hari ketika ada aset yang dipegang tapi belum punya harga dilewati (bukan dinilai 0), agar riwayat yang sudah
+    tersimpan tidak tertimpa nilai palsu. Mengembalikan (Series nilai hari yang lengkap, {aset: [(awal, akhir)] celah harga}).
+    """
+    holdings = holdings_matrix(movements, prices.index[0], prices.index[-1])
+    quantities = holdings.to_numpy(dtype=float)
+    price_matrix = prices.reindex(columns=[f"{a}-USD" for a in holdings.columns]).to_numpy(dtype=float)
+    gap = (np.abs(quantities) > 1e-12) & np.isnan(price_matrix)
+    complete = ~gap.any(axis=1)
+    values = np.nansum(quantities * price_matrix, axis=1)[complete]
+    gaps = {a: _date_ranges(holdings.index, gap[:, i]) for i, a in enumerate(holdings.columns) if gap[:, i].any()}
+    return pd.Series(values, index=holdings.index[complete], name="total_value_usd"), gaps
+
+def backfill_portfolio_history(start=None, end=None, sync_prices=True):
+    """Bangun ulang portfolio_history untuk [start, end] (default: transaksi pertama s/d kemarin).
+
+    Hari ini tidak diisi secara default karena close-nya belum final; snapshot live dashboard yang mengisinya.
+    Hari dengan celah harga tidak ditulis; `price_gaps` merinci rentangnya per aset.
+    """
+    timings, t0 = {}, time.perf_counter()
+    movements = get_ledger_movements()
+    timings["ledger_s"] = time.perf_counter() - t0
+    if movements.empty: return {"days": 0, "skipped_days": 0, "price_gaps": {}, **timings}
+    start = start or pd.to_datetime(movements["timestamp"]).min().date()
+    end = end or date.today() - timedelta(days=1)
+    if end < start: return {"days": 0, "skipped_days": 0, "price_gaps": {}, **timings}
+    t0 = time.perf_counter()
+    assets = sorted(movements["asset"].unique())
+    prices = get_close_matrix([f"{a}-USD" for a in assets], start, end, sync_first=sync_prices)
+    timings["prices_s"] = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    values, gaps = compute_portfolio_history(movements, prices)
+    timings["compute_s"] = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    upsert_portfolio_history(list(zip(values.index.strftime("%Y-%m-%d"), values.round(8).tolist())))
+    timings["write_s"] = time.perf_counter() - t0
+    return {"days": len(values), "skipped_days": len(prices) - len(values), "price_gaps": gaps, **timings}
+
+def format_price_gaps(gaps, limit=3):
+    """Ringkasan celah harga per aset untuk ditampilkan, mis. 'BTC: 2025-06-01 s/d 2026-09-17'."""
+    return "; ".join(f"{asset}: " + ", ".join(a if a == b else f"{a} s/d {b}" for a, b in ranges[:limit]) + (f" (+{len(ranges) - limit} rentang)" if len(ranges) > limit else "")
+                     for asset, ranges in gaps.items())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--start", type=date.fromisoformat)
+    parser.add_argument("--end", type=date.fromisoformat)
+    parser.add_argument("--offline", action="store_true", help="pakai harga yang sudah ada di cache lokal saja")
+    args = parser.parse_args()
+    result = backfill_portfolio_history(args.start, args.end, sync_prices=not args.offline)
+    print(f"{result['days']} hari ditulis. " + ", ".join(f"{k[:-2]} {v * 1000:.0f} ms" for k, v in result.items() if k.endswith("_s")))
+    if result["price_gaps"]: print(f"{result['skipped_days']} hari dilewati karena harga belum ada: {format_price_gaps(result['price_gaps'])}")
+    close_client()
@@ -0,0 +1,87 @@
+import os
+import time
+import threading
+import yfinance as yf
+import perf
+
+# Umur (detik) harga dianggap segar, dan jendela tambahan di mana harga basi masih disajikan
+# sambil disegarkan di background (stale-while-revalidate).
+PRICE_TTL = float(os.getenv("PRICE_CACHE_TTL", "60"))
+PRICE_STALE_WINDOW = float(os.getenv("PRICE_CACHE_STALE_WINDOW", "300"))
+FX_SYMBOL = "IDR=X"
+
+_cache = {}          # simbol -> (harga, waktu_fetch)
+_tracked = {FX_SYMBOL}  # semua simbol yang pernah diminta, ikut diunduh di setiap bulk download
+_stats = {"hits": 0, "stale_hits": 0, "misses": 0, "downloads": 0, "errors": 0}
+_lock = threading.Lock()
+_refreshing = False
+
+def _download(symbols):
+    """Satu bulk download untuk semua simbol; mengembalikan dict simbol -> harga close terakhir."""
+    symbols = sorted(symbols)
+    with _lock: _stats["downloads"] += 1
+    with perf.span("yfinance.download", symbols=len(symbols), period="5d"):
+        data = yf.download(symbols, period="5d", progress=False, auto_adjust=False, threads=True)
+    if data is None or data.empty: return {}
+    close = data["Close"]
+    if not hasattr(close, "columns"): close = close.to_frame(name=symbols[0])
+    last = close.ffill().iloc[-1]
+    return {s: float(last[s]) for s in symbols if s in last.index and last[s] == last[s]}
+
+def _store(prices):
+    now = time.monotonic()
+    with _lock:
+        for symbol, price in prices.items(): _cache[symbol] = (price, now)
+
+def _refresh_in_background(symbols):
+    global _refreshing
+    def run():
+        global _refreshing
+        try: _store(_download(symbols))
+        except Exception:
+            with _lock: _stats["errors"] += 1
+        finally: _refreshing = False
+    with _lock:
+        if _refreshing: return
+        _refreshing = True
+    threading.Thread(target=run, name="price_refresh", daemon=True).start()
+
+def get_prices(symbols, ttl=None):
+    """Harga terakhir (USD) untuk daftar simbol Yahoo, dilayani dari cache bila masih segar."""
+    ttl = PRICE_TTL if ttl is None else ttl
+    now, result, missing, stale = time.monotonic(), {}, set(), False
+    with _lock:
+        _tracked.update(symbols)
+        for symbol in symbols:
+            entry = _cache.get(symbol)
+            age = now - entry[1] if entry else None
+            if entry and age < ttl: _stats["hits"] += 1; result[symbol] = entry[0]
+            elif entry and age < ttl + PRICE_STALE_WINDOW: _stats["stale_hits"] += 1; result[symbol] = entry[0]; stale = True
+            else: _stats["misses"] += 1; missing.add(symbol)
+        tracked = set(_tracked)
+    perf.count("price_cache.hits", len(result)); perf.count("price_cache.misses", len(missing))
+    if missing:
+        # Sekalian unduh semua simbol yang dilacak agar rerun berikutnya tidak butuh request lagi
+        try:
+            prices = _download(tracked)
+            _store(prices)
+            result.update({s: prices[s] for s in missing if s in prices})
+        except Exception:
+            with _lock: _stats["errors"] += 1
+    elif stale:
+        _refresh_in_background(tracked)
+    return result
+
+def get_price(symbol, ttl=None):
+    return get_prices([symbol], ttl).get(symbol)
+
+def get_asset_prices(assets, ttl=None):
+    """Harga USD per aset kripto (mis. 'BTC' -> harga 'BTC-USD')."""
+    prices = get_prices([f"{a}-USD" for a in assets], ttl)
+    return {a: prices[f"{a}-USD"] for a in assets if f"{a}-USD" in prices}
+
+def get_cache_stats():
+    with _lock: return {**_stats, "cached_symbols": len(_cache)}
+
+def clear_cache():
+    with _lock: _cache.clear(); _stats.update({k: 0 for k in _stats})
@@ -0,0 +1,441 @@
+"""Mode replika lokal (local-first) untuk database.py: baca-tulis ke file SQLite lokal, sinkron ke primary di background.
+
+Setiap perubahan baris di replika dicatat oleh trigger TEMP (hanya terpasang di koneksi aplikasi) ke tabel `_outbox`,
+dalam transaksi yang sama dengan perubahannya. Worker `replica_sync` mendorong outbox ke primary (Turso, sqld, atau file
+SQLite kedua saat testing) dengan membaca isi terkini baris per primary key, lalu berkala menarik perubahan dari primary.
+Koneksi worker tidak punya trigger, jadi baris hasil tarikan tidak kembali masuk outbox.
+
+Konflik:
+- Entri outbox diberi nomor transaksi lokal (`txn`) dan didorong per transaksi dalam satu batch primary, jadi ledger dan
+  holdings dari satu add_transaction diterima atau ditolak bersama.
+- Id INTEGER baru (transactions, trading_journal, price_alerts, ...) dialokasikan lokal, jadi bisa bentrok dengan id dari
+  perangkat lain. Baris baru didorong tanpa id-nya; id pilihan primary dicatat di `_replica_push_ids` (di primary, dalam
+  batch yang sama) lalu id lokal, kolom foreign key yang merujuknya (mis. trading_journal.transaction_id), dan outbox
+  tertunda dipindah ke id tersebut. Baris yang sama persis pada kolom UNIQUE (mis. import_hash) memakai id yang sudah ada.
+- Setiap transaksi lokal meninggalkan penanda di `_replica_pushes`, jadi dorongan ulang setelah koneksi putus di tengah
+  batch tidak menyisipkan baris ganda. Transaksi yang tetap ditolak primary (mis. constraint lain) disimpan di
+  `_sync_conflicts`, perubahan tertunda lain pada baris yang sama dibuang, dan tabelnya disegarkan penuh dari primary.
+- Tabel berkunci alami (holdings, ledger_totals, ai_briefings, ...) dan UPDATE didorong sebagai upsert (penulis terakhir
+  menang). Jika dua perangkat menulis ledger bersamaan, jalankan `python database.py verify-holdings` setelahnya.
+- Tabel yang masih punya perubahan lokal di outbox tidak pernah ditimpa hasil tarikan.
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import namedtuple
+import libsql_client
+
+PUSH_INTERVAL = float(os.getenv("TURSO_REPLICA_PUSH_INTERVAL", "2"))
+PULL_INTERVAL = float(os.getenv("TURSO_REPLICA_PULL_INTERVAL", "60"))
+PUSH_BATCH = 500         # entri outbox per batch ke primary (satu round trip, satu transaksi)
+PULL_PAGE = 5000         # baris per halaman saat menarik tabel dari primary
+SMALL_TABLE_ROWS = 5000  # tabel sekecil ini selalu dibandingkan penuh setiap tarikan (menangkap UPDATE/DELETE remote)
+MAX_BACKOFF = 60
+PUSH_LOG_DAYS = 7        # umur penanda dorongan & peta id di primary sebelum dibersihkan
+
+_META_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS _outbox (seq INTEGER PRIMARY KEY AUTOINCREMENT, txn INTEGER, tbl TEXT NOT NULL, op TEXT NOT NULL, pk TEXT NOT NULL, created_at REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS _sync_conflicts (id INTEGER PRIMARY KEY, created_at DATETIME DEFAULT CURRENT_TIMESTAMP, tbl TEXT, op TEXT, pk TEXT, local_row TEXT, error TEXT)",
+    "CREATE TABLE IF NOT EXISTS _replica_meta (key TEXT PRIMARY KEY, value TEXT)",
+]
+_PRIMARY_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS _replica_pushes (push_key TEXT PRIMARY KEY, pushed_at REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS _replica_push_ids (push_key TEXT NOT NULL, tbl TEXT NOT NULL, local_id INTEGER NOT NULL, remote_id INTEGER, pushed_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS idx_replica_push_ids_key ON _replica_push_ids (push_key)",
+]
+_ID_LOOKUP = "(SELECT remote_id FROM _replica_push_ids WHERE push_key = ? AND tbl = ? AND local_id = ?)"
+_NOW = "((julianday('now') - 2440587.5) * 86400.0)"
+
+Table = namedtuple("Table", "name columns pk integer_pk refs uniques")
+PushOp = namedtuple("PushOp", "table op key pk row")
+
+def _describe(conn):
+    """Tabel yang disinkronkan (semua tabel ber-primary key kecuali tabel internal berawalan `_`)."""
+    tables = {}
+    for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite%' AND substr(name, 1, 1) != '_' ORDER BY name").fetchall():
+        info = conn.execute(f"PRAGMA table_info({name})").fetchall()
+        pk = [r[1] for r in sorted((r for r in info if r[5]), key=lambda r: r[5])]
+        if not pk: continue
+        refs = {r[3]: r[2] for r in conn.execute(f"PRAGMA foreign_key_list({name})").fetchall()}
+        uniques = [tuple(c[2] for c in conn.execute(f"PRAGMA index_info({ix[1]})").fetchall())
+                   for ix in conn.execute(f"PRAGMA index_list({name})").fetchall() if ix[2] and ix[3] != "pk"]
+        tables[name] = Table(name, tuple(r[1] for r in info), tuple(pk), len(pk) == 1 and any(r[1] == pk[0] and r[2].upper() == "INTEGER" for r in info), refs, uniques)
+    return tables
+
+def _install_triggers(conn, tables):
+    for t in tables.values():
+        new, old = (f"json_array({', '.join(f'{p}.{c}' for c in t.pk)})" for p in ("NEW", "OLD"))
+        changed = " OR ".join(f"OLD.{c} IS NOT NEW.{c}" for c in t.pk)
+        conn.executescript(f"""
+            CREATE TEMP TRIGGER IF NOT EXISTS _outbox_{t.name}_insert AFTER INSERT ON {t.name} BEGIN
+                INSERT INTO _outbox (tbl, op, pk, created_at) VALUES ('{t.name}', 'insert', {new}, {_NOW}); END;
+            CREATE TEMP TRIGGER IF NOT EXISTS _outbox_{t.name}_update AFTER UPDATE ON {t.name} BEGIN
+                INSERT INTO _outbox (tbl, op, pk, created_at) SELECT '{t.name}', 'delete', {old}, {_NOW} WHERE {changed};
+                INSERT INTO _outbox (tbl, op, pk, created_at) VALUES ('{t.name}', 'update', {new}, {_NOW}); END;
+            CREATE TEMP TRIGGER IF NOT EXISTS _outbox_{t.name}_delete AFTER DELETE ON {t.name} BEGIN
+                INSERT INTO _outbox (tbl, op, pk, created_at) VALUES ('{t.name}', 'delete', {old}, {_NOW}); END;
+        """)
+
+def _is_read(sql):
+    return sql.lstrip()[:6].upper() in ("SELECT", "PRAGMA")
+
+def _result(cursor):
+    if cursor.description is None: return libsql_client.ResultSet((), [], max(cursor.rowcount, 0), cursor.lastrowid)
+    return libsql_client.ResultSet(tuple(d[0] for d in cursor.description), cursor.fetchall(), 0, cursor.lastrowid)
+
+def _error(e):
+    # Samakan dengan client libsql agar connection() di database.py memperlakukannya sebagai error SQL biasa
+    return libsql_client.LibsqlError(str(e), getattr(e, "sqlite_errorname", None) or "SQLITE_ERROR")
+
+def _push_statements(t, op, pk, row, push_key, pending, now):
+    """Statement primary untuk satu baris. Baris ber-id INTEGER baru disisipkan tanpa id lokalnya, diikuti pencatatan id
+    pilihan primary di `_replica_push_ids`; rujukan ke baris yang disisipkan di batch yang sama (`pending`, diisi di sini)
+    membaca id itu kembali lewat subquery."""
+    def value(table, v):
+        key = pending.get((table, v))
+        return (_ID_LOOKUP, [key, table, v]) if key else ("?", [v])
+    def values(columns):
+        exprs = [value(t.refs.get(c), v) for c, v in columns]
+        return [e for e, _ in exprs], [a for _, args in exprs for a in args]
+    if t.integer_pk:
+        where, where_args = value(t.name, pk[0]); where = f"{t.pk[0]} = {where}"
+    else:
+        where, where_args = " AND ".join(f"{c} = ?" for c in t.pk), list(pk)
+    if row is None:
+        if op == "insert" and t.integer_pk:
+            pending[(t.name, pk[0])] = push_key  # disisipkan lalu dihapus sebelum sempat didorong: rujukan berikutnya jadi NULL
+            return []
+        return [libsql_client.Statement(f"DELETE FROM {t.name} WHERE {where}", where_args)]
+    data, others = dict(zip(t.columns, row)), [c for c in t.columns if c not in t.pk]
+    if op == "insert" and t.integer_pk:
+        exprs, args = values((c, data[c]) for c in others)
+        uniques = [u for u in t.uniques if all(data[c] is not None for c in u)]
+        duplicate = " OR ".join("(" + " AND ".join(f"{c} = ?" for c in u) + ")" for u in uniques)
+        remote_id = f"(SELECT {t.pk[0]} FROM {t.name} WHERE {duplicate} LIMIT 1)" if duplicate else "NULL"
+        pending[(t.name, pk[0])] = push_key
+        return [
+            libsql_client.Statement(f"INSERT INTO {t.name} ({', '.join(others)}) VALUES ({', '.join(exprs)}) ON CONFLICT DO NOTHING", args),
+            libsql_client.Statement(
+                "INSERT INTO _replica_push_ids (push_key, tbl, local_id, remote_id, pushed_at) "
+                f"SELECT ?, ?, ?, CASE WHEN changes() = 1 THEN last_insert_rowid() ELSE {remote_id} END, ?",
+                [push_key, t.name, pk[0], *(data[c] for u in uniques for c in u), now]
+            ),
+        ]
+    if t.integer_pk and (t.name, pk[0]) in pending:
+        # Id primary baris ini baru diketahui di dalam batch: ubah lewat subquery, bukan upsert dengan id lokal
+        exprs, args = values((c, data[c]) for c in others)
+        if not others: return []
+        return [libsql_client.Statement(f"UPDATE {t.name} SET {', '.join(f'{c} = {e}' for c, e in zip(others, exprs))} WHERE {where}", args + where_args)]
+    exprs, args = values(zip(t.columns, row))
+    sql = f"INSERT INTO {t.name} ({', '.join(t.columns)}) VALUES ({', '.join(exprs)})"
+    if others: sql += f" ON CONFLICT({', '.join(t.pk)}) DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in others)}"
+    return [libsql_client.Statement(sql, args)]
+
+class ReplicaClient:
+    """Pengganti client libsql sinkron (execute, batch, close, closed) yang melayani semua query dari replika lokal.
+
+    `primary_factory()` membuat client libsql ke primary; `init_schema(client)` membuat skema aplikasi dan dijalankan
+    di replika maupun primary. Bootstrap pertama (replika belum pernah terisi) wajib online; setelahnya replika
+    tetap bisa dibaca dan ditulis saat primary tidak terjangkau, dan outbox didorong begitu primary kembali.
+    """
+
+    def __init__(self, path, primary_factory, init_schema):
+        self.path, self._primary_factory, self._init_schema = path, primary_factory, init_schema
+        self._primary, self._primary_ready = None, False
+        self._local, self._connections, self._conn_lock = threading.local(), {}, threading.Lock()  # koneksi -> thread pemiliknya
+        self._sync_lock, self._stop, self._wake = threading.Lock(), threading.Event(), threading.Event()
+        self._tables, self._dirty = {}, set()
+        self._stats = {"last_push_at": None, "last_pull_at": None, "pushed": 0, "pulled": 0, "last_error": None}
+        self.closed = False
+        self._worker_conn = self._open()
+        for sql in _META_SCHEMA: self._worker_conn.execute(sql)
+        init_schema(self)  # trigger outbox belum terpasang, DDL tidak pernah dicatat
+        self._tables = _describe(self._worker_conn)
+        self._worker_conn.execute("INSERT OR IGNORE INTO _replica_meta (key, value) VALUES ('replica_id', lower(hex(randomblob(8))))")
+        self._replica_id = self._worker_conn.execute("SELECT value FROM _replica_meta WHERE key = 'replica_id'").fetchone()[0]
+        if self._worker_conn.execute("SELECT value FROM _replica_meta WHERE key = 'bootstrapped'").fetchone() is None:
+            self._pull(self._get_primary(), full=True)
+            self._worker_conn.execute("INSERT OR REPLACE INTO _replica_meta (key, value) VALUES ('bootstrapped', ?)", (str(time.time()),))
+        self._thread = threading.Thread(target=self._run, name="replica_sync", daemon=True)
+        self._thread.start()
+
+    # --- koneksi lokal (satu per thread, WAL agar pembaca tidak menunggu penulis) ---
+    def _open(self, owner=None):
+        """Koneksi baru milik thread `owner` (None = koneksi worker, hidup sampai close())."""
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL"); conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn_lock:
+            # Tiap rerun Streamlit (dan tiap worker to_thread/pool) memakai thread baru: tutup koneksi thread yang sudah selesai
+            for old, thread in list(self._connections.items()):
+                if thread is not None and not thread.is_alive():
+                    del self._connections[old]
+                    try: old.close()
+                    except Exception: pass
+            self._connections[conn] = owner
+        return conn
+
+    def _conn(self):
+        if self.closed: raise libsql_client.LibsqlError("Client replika sudah ditutup.", "CLIENT_CLOSED")
+        local = self._local
+        if getattr(local, "conn", None) is None: local.conn, local.tables = self._open(threading.current_thread()), None
+        if local.tables is not self._tables:
+            _install_triggers(local.conn, self._tables); local.tables = self._tables
+        return local.conn
+
+    def execute(self, stmt, args=None):
+        stmt = libsql_client.Statement.convert(stmt, args)
+        if not _is_read(stmt.sql): return self.batch([stmt])[0]  # tulisan selalu lewat batch agar entri outbox-nya bernomor transaksi
+        try:
+            return _result(self._conn().execute(stmt.sql, stmt.args or ()))
+        except sqlite3.Error as e:
+            raise _error(e) from e
+
+    def batch(self, stmts):
+        """Semua statement dalam satu transaksi lokal (IMMEDIATE jika ada tulisan), seperti batch libsql."""
+        stmts = [libsql_client.Statement.convert(s) for s in stmts]
+        conn = self._conn(); before = conn.total_changes
+        read_only = all(_is_read(s.sql) for s in stmts)
+        try:
+            conn.execute("BEGIN" if read_only else "BEGIN IMMEDIATE")
+            try:
+                last_seq = None if read_only else conn.execute("SELECT coalesce(max(seq), 0) FROM _outbox").fetchone()[0]
+                results = [_result(conn.execute(s.sql, s.args or ())) for s in stmts]
+                if conn.total_changes != before and last_seq is not None:
+                    conn.execute("UPDATE _outbox SET txn = (SELECT min(seq) FROM _outbox WHERE seq > ?1) WHERE seq > ?1", (last_seq,))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK"); raise
+        except sqlite3.Error as e:
+            raise _error(e) from e
+        if conn.total_changes != before: self._wake.set()
+        return results
+
+    def close(self):
+        """Hentikan worker (dengan satu dorongan terakhir bila primary terjangkau) lalu tutup semua koneksi."""
+        if self.closed: return
+        self._stop.set(); self._wake.set()
+        if self._thread.is_alive() and self._thread is not threading.current_thread(): self._thread.join(timeout=15)
+        self.closed = True
+        with self._conn_lock:
+            for conn in self._connections:
+                try: conn.close()
+                except Exception: pass
+            self._connections.clear()
+        self._discard_primary()
+
+    # --- primary ---
+    def _get_primary(self):
+        if self._primary is None: self._primary = self._primary_factory()
+        if not self._primary_ready:
+            self._init_schema(self._primary)
+            self._primary.batch(_PRIMARY_SCHEMA); self._primary_ready = True
+        return self._primary
+
+    def _discard_primary(self):
+        if self._primary is not None:
+            try: self._primary.close()
+            except Exception: pass
+        self._primary, self._primary_ready = None, False
+
+    # --- worker ---
+    def _run(self):
+        failures, last_pull = 0, float("-inf")
+        while not self._stop.is_set():
+            if failures: self._stop.wait(min(MAX_BACKOFF, PUSH_INTERVAL * 2 ** failures))  # primary bermasalah: jangan dibangunkan tiap tulisan
+            else: self._wake.wait(PUSH_INTERVAL)
+            self._wake.clear()
+            if self._stop.is_set(): break
+            pull = time.monotonic() - last_pull >= PULL_INTERVAL
+            try:
+                self.sync(pull=pull)
+            except Exception as e:
+                failures += 1; self._stats["last_error"] = f"{type(e).__name__}: {e}"
+                if not isinstance(e, libsql_client.LibsqlError): self._discard_primary()
+                continue
+            failures, self._stats["last_error"] = 0, None
+            if pull: last_pull = time.monotonic()
+        try: self.sync(pull=False)
+        except Exception: pass
+
+    def sync(self, pull=True):
+        """Dorong seluruh outbox ke primary, lalu (opsional) tarik perubahan primary ke replika."""
+        with self._sync_lock:
+            primary = self._get_primary()
+            while self._push(primary): pass
+            if pull:
+                self._pull(primary)
+                cutoff = time.time() - PUSH_LOG_DAYS * 86400
+                primary.batch([libsql_client.Statement(f"DELETE FROM {t} WHERE pushed_at < ?", [cutoff]) for t in ("_replica_pushes", "_replica_push_ids")])
+
+    def _push(self, primary):
+        """Dorong satu batch outbox (tanpa memotong transaksi lokal); mengembalikan True jika masih ada sisa."""
+        conn = self._worker_conn
+        entries = conn.execute("SELECT seq, coalesce(txn, seq), tbl, op, pk FROM _outbox ORDER BY seq LIMIT ?", (PUSH_BATCH,)).fetchall()
+        if not entries: return False
+        more = len(entries) == PUSH_BATCH
+        if more: entries += conn.execute("SELECT seq, txn, tbl, op, pk FROM _outbox WHERE txn = ? AND seq > ? ORDER BY seq", entries[-1][1::-1]).fetchall()
+        # Per transaksi: satu statement per baris, op pertama menentukan INSERT vs upsert, posisi mengikuti perubahan terakhirnya
+        units = {}
+        for _, txn, tbl, op, pk in entries:
+            rows = units.setdefault(txn, {})
+            rows[(tbl, pk)] = rows.pop((tbl, pk), op)
+        plan, pending, now = [], {}, time.time()
+        for txn, rows in units.items():
+            key, ops = f"{self._replica_id}:{txn}", [self._push_op(tbl, op, pk) for (tbl, pk), op in rows.items() if tbl in self._tables]
+            stmts = [libsql_client.Statement("INSERT INTO _replica_pushes (push_key, pushed_at) VALUES (?, ?)", [key, now])]
+            for o in ops: stmts += _push_statements(o.table, o.op, o.pk, o.row, key, pending, now)
+            plan.append((key, ops, stmts))
+        try:
+            primary.batch([st for _, _, stmts in plan for st in stmts])
+        except libsql_client.LibsqlError:
+            # Batch primary di-rollback utuh: ulangi per transaksi lokal untuk memisahkan yang bentrok. Transaksi yang
+            # penandanya sudah ada di primary sudah diterapkan sebelum koneksi putus; transaksi yang menyentuh baris dari
+            # transaksi yang ditolak ikut ditolak (subquery id-nya tidak akan menemukan apa pun).
+            rejected = set()
+            for key, ops, stmts in plan:
+                if any(o.key in rejected for o in ops):
+                    rejected |= self._reject(ops, "bergantung pada transaksi lokal lain yang ditolak primary"); continue
+                try: primary.batch(stmts)
+                except libsql_client.LibsqlError as e:
+                    if e.code in ("SQLITE_BUSY", "SQLITE_LOCKED"): raise  # primary sibuk, bukan penolakan: ulangi seluruh batch nanti
+                    if not primary.execute("SELECT 1 FROM _replica_pushes WHERE push_key = ?", [key]).rows: rejected |= self._reject(ops, e)
+        ids = self._pushed_ids(primary, [key for key, _, _ in plan]) if pending else {}
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM _outbox WHERE seq <= ?", (entries[-1][0],))
+            self._remap(ids)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK"); raise
+        self._stats["pushed"] += sum(len(ops) for _, ops, _ in plan); self._stats["last_push_at"] = time.time()
+        return more
+
+    def _push_op(self, tbl, op, key):
+        t, pk = self._tables[tbl], json.loads(key)
+        row = self._worker_conn.execute(f"SELECT {', '.join(t.columns)} FROM {t.name} WHERE " + " AND ".join(f"{c} = ?" for c in t.pk), pk).fetchone()
+        return PushOp(t, op, (tbl, key), pk, row)
+
+    def _pushed_ids(self, primary, keys):
+        """Id pilihan primary untuk baris yang disisipkan oleh transaksi `keys`: {(tabel, id lokal): id primary}."""
+        order, ids = {k: i for i, k in enumerate(keys)}, {}
+        for i in range(0, len(keys), 200):
+            chunk = keys[i:i + 200]
+            rs = primary.execute(f"SELECT push_key, tbl, local_id, remote_id FROM _replica_push_ids WHERE push_key IN ({', '.join('?' * len(chunk))})", chunk)
+            for key, tbl, local_id, remote_id in sorted(rs.rows, key=lambda r: order[r[0]]): ids[(tbl, local_id)] = remote_id
+        return ids
+
+    def _remap(self, ids):
+        """Pindahkan baris lokal ke id pilihan primary, beserta kolom foreign key yang merujuknya dan entri outbox tertunda.
+        Dijalankan di dalam transaksi koneksi worker (tanpa trigger, jadi pemindahan ini tidak masuk outbox)."""
+        conn = self._worker_conn
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS _remap (old INTEGER PRIMARY KEY, new INTEGER, duplicate INTEGER NOT NULL DEFAULT 0)")
+        for tbl in sorted({tbl for tbl, _ in ids}):
+            t, id_ = self._tables[tbl], self._tables[tbl].pk[0]
+            pairs = [(old, new) for (name, old), new in ids.items() if name == tbl and old != new]
+            for old in [old for old, new in pairs if new is None]:
+                # Tidak ada id primary (insert diabaikan tanpa baris kembar yang bisa ditemukan): catat dan ambil dari primary
+                row = conn.execute(f"SELECT {', '.join(t.columns)} FROM {tbl} WHERE {id_} = ?", (old,)).fetchone()
+                self._reject([PushOp(t, "insert", (tbl, json.dumps([old])), [old], row)], "primary tidak mengembalikan id untuk baris baru")
+            conn.execute("DELETE FROM _remap")
+            conn.executemany("INSERT INTO _remap (old, new) VALUES (?, ?)", [(old, new) for old, new in pairs if new is not None])
+            # Id tujuan sudah dipakai baris lokal lain: jika baris itu sudah sinkron berarti baris ini kembarannya (dibuang),
+            # jika masih tertunda di outbox, baris itu digeser ke id lokal baru (id primary-nya menyusul saat didorong)
+            occupied = conn.execute(f"SELECT {id_} FROM {tbl} WHERE {id_} IN (SELECT new FROM _remap) AND {id_} NOT IN (SELECT old FROM _remap)").fetchall()
+            fresh = conn.execute(f"SELECT max(coalesce((SELECT max({id_}) FROM {tbl}), 0), coalesce((SELECT max(new) FROM _remap), 0)) + 1").fetchone()[0]
+            for (occupant,) in occupied:
+                if conn.execute("SELECT 1 FROM _outbox WHERE tbl = ? AND pk = json_array(?)", (tbl, occupant)).fetchone():
+                    conn.execute("INSERT INTO _remap (old, new) VALUES (?, ?)", (occupant, fresh)); fresh += 1
+                else:
+                    conn.execute("UPDATE _remap SET duplicate = 1 WHERE new = ?", (occupant,))
+            conn.execute(f"DELETE FROM {tbl} WHERE {id_} IN (SELECT old FROM _remap WHERE duplicate = 1)")
+            # Dua tahap lewat id negatif agar pertukaran/rantai id tidak menabrak constraint primary key
+            conn.execute(f"UPDATE {tbl} SET {id_} = -{id_} WHERE {id_} IN (SELECT old FROM _remap WHERE duplicate = 0)")
+            conn.execute(f"UPDATE {tbl} SET {id_} = (SELECT new FROM _remap WHERE old = -{tbl}.{id_}) WHERE {id_} < 0 AND -{id_} IN (SELECT old FROM _remap)")
+            for child in self._tables.values():
+                for column in (c for c, parent in child.refs.items() if parent == tbl):
+                    conn.execute(f"UPDATE {child.name} SET {column} = (SELECT new FROM _remap WHERE old = {child.name}.{column}) WHERE {column} IN (SELECT old FROM _remap)")
+            conn.execute(
+                "UPDATE _outbox SET pk = json_array((SELECT new FROM _remap WHERE old = json_extract(_outbox.pk, '$[0]'))) "
+                "WHERE tbl = ? AND json_extract(pk, '$[0]') IN (SELECT old FROM _remap)", (tbl,)
+            )
+
+    def _reject(self, unit, error):
+        """Primary menang: catat baris-baris transaksi lokal yang ditolak, buang perubahan tertunda lain pada baris yang sama,
+        dan tandai tabelnya untuk disegarkan penuh pada tarikan berikutnya. Mengembalikan kunci baris yang ditolak."""
+        conn = self._worker_conn
+        for o in unit:
+            conn.execute(
+                "INSERT INTO _sync_conflicts (tbl, op, pk, local_row, error) VALUES (?, ?, ?, ?, ?)",
+                (o.table.name, o.op, o.key[1], json.dumps(dict(zip(o.table.columns, o.row)) if o.row else None, default=str), str(error))
+            )
+            conn.execute("DELETE FROM _outbox WHERE tbl = ? AND pk = ?", o.key)
+            self._dirty.add(o.table.name)
+        return {o.key for o in unit}
+
+    def _pull(self, primary, full=False):
+        """Tarik perubahan primary: tabel kecil/kotor dibandingkan penuh, tabel besar ber-id INTEGER cukup baris id baru
+        (disegarkan penuh hanya bila jumlah barisnya tetap berbeda, mis. karena DELETE di primary)."""
+        conn, pulled = self._worker_conn, 0
+        for t in self._tables.values():
+            count_sql = f"SELECT count(*), max(rowid) FROM {t.name}"
+            remote_count, remote_max = primary.execute(count_sql).rows[0]
+            local_count, local_max = conn.execute(count_sql).fetchone()
+            refresh = full or t.name in self._dirty or remote_count <= SMALL_TABLE_ROWS
+            if not refresh:
+                if t.integer_pk and (remote_max or 0) > (local_max or 0):
+                    applied = self._apply(t, self._stage(primary, t, after=local_max or 0), replace=False)
+                    if applied is None: continue
+                    pulled += applied; local_count = conn.execute(count_sql).fetchone()[0]
+                refresh = local_count != remote_count
+            if refresh:
+                applied = self._apply(t, self._stage(primary, t), replace=True)
+                if applied is not None: pulled += applied; self._dirty.discard(t.name)
+        self._stats["pulled"] += pulled; self._stats["last_pull_at"] = time.time()
+
+    def _stage(self, primary, t, after=None):
+        """Salin baris primary (seluruhnya, atau rowid > `after`) per halaman ke tabel TEMP; memori tetap terbatas."""
+        conn, stage, cols = self._worker_conn, f"_stage_{t.name}", ", ".join(t.columns)
+        conn.execute(f"CREATE TEMP TABLE IF NOT EXISTS {stage} AS SELECT {cols} FROM main.{t.name} WHERE 0")
+        conn.execute(f"DELETE FROM {stage}")
+        cursor = after or 0
+        while True:
+            rs = primary.execute(f"SELECT rowid, {cols} FROM {t.name} WHERE rowid > ? ORDER BY rowid LIMIT ?", (cursor, PULL_PAGE))
+            if rs.rows:
+                conn.execute("BEGIN")
+                conn.executemany(f"INSERT INTO {stage} VALUES ({', '.join('?' * len(t.columns))})", (tuple(r)[1:] for r in rs.rows))
+                conn.execute("COMMIT")
+                cursor = rs.rows[-1][0]
+            if len(rs.rows) < PULL_PAGE: return stage
+
+    def _apply(self, t, stage, replace):
+        """Terapkan tabel staging ke replika dalam satu transaksi. None jika dilewati karena ada perubahan lokal tertunda."""
+        conn, cols = self._worker_conn, ", ".join(t.columns)
+        conn.execute("BEGIN IMMEDIATE")  # tulisan aplikasi tertahan, jadi cek outbox di bawah ini tidak bisa basi
+        try:
+            if conn.execute("SELECT 1 FROM _outbox WHERE tbl = ? LIMIT 1", (t.name,)).fetchone():
+                conn.execute("ROLLBACK"); return None
+            if not replace:
+                applied = conn.execute(f"INSERT OR REPLACE INTO main.{t.name} ({cols}) SELECT {cols} FROM {stage}").rowcount
+            elif conn.execute(f"SELECT 1 FROM (SELECT {cols} FROM {stage} EXCEPT SELECT {cols} FROM main.{t.name}) UNION ALL "
+                              f"SELECT 1 FROM (SELECT {cols} FROM main.{t.name} EXCEPT SELECT {cols} FROM {stage}) LIMIT 1").fetchone():
+                conn.execute(f"DELETE FROM main.{t.name}")
+                applied = conn.execute(f"INSERT INTO main.{t.name} ({cols}) SELECT {cols} FROM {stage}").rowcount
+            else:
+                applied = 0
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK"); raise
+        conn.execute(f"DELETE FROM {stage}")
+        return applied
+
+    # --- metrik ---
+    def status(self):
+        """Lag sinkron: jumlah perubahan lokal yang belum sampai primary, umur yang tertua (push_lag_s), dan umur tarikan terakhir."""
+        conn, now = self._conn(), time.time()
+        pending, oldest = conn.execute("SELECT count(*), min(created_at) FROM _outbox").fetchone()
+        conflicts = conn.execute("SELECT count(*) FROM _sync_conflicts").fetchone()[0]
+        last_pull = self._stats["last_pull_at"]
+        return {"mode": "replica", "path": self.path, "pending": pending, "push_lag_s": now - oldest if oldest else 0.0,
+                "pull_age_s": now - last_pull if last_pull else None, "conflicts": conflicts, "online": self._stats["last_error"] is None, **self._stats}
@@ -0,0 +1,83 @@
+"""Replika lokal vs primary bersama: id INTEGER yang dialokasikan lokal di dua perangkat tidak boleh saling menolak."""
+import sqlite3
+import time
+import threading
+import pytest
+import libsql_client
+import database
+import replica
+
+@pytest.fixture
+def devices(tmp_path, monkeypatch):
+    monkeypatch.setattr(replica.ReplicaClient, "_run", lambda self: None)  # tanpa worker: sinkron hanya lewat sync() di test
+    primary = tmp_path / "primary.db"
+    clients = []
+    def device(name):
+        client = replica.ReplicaClient(str(tmp_path / f"{name}.db"), lambda: libsql_client.create_client_sync(url=f"file:{primary}"), database._create_schema)
+        clients.append(client)
+        return client
+    def use(client):
+        monkeypatch.setattr(database, "_client", client); monkeypatch.setattr(database, "_client_checked_at", time.monotonic())
+    yield device, use, primary
+    for client in clients: client.close()
+
+_JOURNAL = "SELECT j.id, j.transaction_id, t.asset, j.entry_reason FROM trading_journal j JOIN transactions t ON j.transaction_id = t.id ORDER BY j.id"
+
+def _journal(client):
+    return [tuple(r) for r in client.execute(_JOURNAL).rows]
+
+def _primary_rows(primary, sql):
+    with sqlite3.connect(primary) as conn: return conn.execute(sql).fetchall()
+
+def test_colliding_local_ids_are_remapped(devices):
+    device, use, primary = devices
+    laptop, phone = device("laptop"), device("phone")
+    use(laptop); database.add_transaction("BTC", "BUY", 1.0, 100.0); database.add_journal_entry(1, "breakout", "", "")
+    use(phone); database.add_transaction("ETH", "BUY", 2.0, 10.0); database.add_journal_entry(1, "dip", "", "")
+    laptop.sync(); phone.sync(); laptop.sync()
+
+    # Urutan dorong antar perangkat bebas (worker masing-masing ikut jalan), yang penting isi dan id-nya sama di semua tempat
+    expected = _primary_rows(primary, _JOURNAL)
+    assert sorted(r[2:] for r in expected) == [("BTC", "breakout"), ("ETH", "dip")]
+    assert sorted(r[0] for r in _primary_rows(primary, "SELECT asset FROM transactions")) == ["BTC", "ETH"]
+    for client in (laptop, phone):
+        use(client)
+        assert _journal(client) == expected
+        assert client.status()["conflicts"] == 0 and client.status()["pending"] == 0
+        assert database.rebuild_holdings(fix=False) == []
+
+def test_pending_row_on_remote_id_moves_aside(devices, monkeypatch):
+    device, use, primary = devices
+    laptop, phone = device("laptop"), device("phone")
+    use(laptop); database.add_transaction("BTC", "BUY", 1.0, 100.0)
+    laptop.sync()
+    use(phone)
+    database.add_transaction("ETH", "BUY", 2.0, 10.0); database.add_transaction("SOL", "BUY", 3.0, 5.0)
+    database.add_journal_entry(2, "rotasi", "", "")
+    monkeypatch.setattr(replica, "PUSH_BATCH", 1)  # dorong satu transaksi lokal per batch: SOL (id lokal 2) masih tertunda saat ETH mendapat id 2
+    phone.sync()
+
+    assert _primary_rows(primary, "SELECT id, asset FROM transactions ORDER BY id") == [(1, "BTC"), (2, "ETH"), (3, "SOL")]
+    assert _journal(phone) == [(1, 3, "SOL", "rotasi")]
+    assert _primary_rows(primary, "SELECT transaction_id FROM trading_journal") == [(3,)]
+    assert phone.status()["conflicts"] == 0
+
+def test_import_hash_duplicate_reuses_primary_row(devices):
+    device, use, primary = devices
+    laptop, phone = device("laptop"), device("phone")
+    insert = "INSERT INTO transactions (asset, type, quantity, price, import_hash) VALUES ('BTC', 'BUY', 1.0, 100.0, 'abc')"
+    laptop.execute(insert); phone.execute("INSERT INTO transactions (asset, type, quantity, price) VALUES ('ETH', 'BUY', 1.0, 10.0)"); phone.execute(insert)
+    laptop.sync(); phone.sync()
+
+    assert _primary_rows(primary, "SELECT id, asset, import_hash FROM transactions ORDER BY id") == [(1, "BTC", "abc"), (2, "ETH", None)]
+    assert [tuple(r) for r in phone.execute("SELECT id, asset FROM transactions ORDER BY id").rows] == [(1, "BTC"), (2, "ETH")]
+    assert phone.status()["conflicts"] == 0
+
+def test_connections_of_finished_threads_are_closed(devices):
+    device, use, primary = devices
+    laptop = device("laptop")
+    def read(): laptop.execute("SELECT count(*) FROM transactions")
+    for _ in range(50):  # seperti rerun Streamlit: setiap run di thread baru
+        t = threading.Thread(target=read); t.start(); t.join()
+    read()
+    assert len(laptop._connections) <= 3  # worker, thread utama, dan paling banyak satu thread yang baru selesai
@@ -0,0 +1,86 @@
+"""Impor massal: pemetaan kolom ekspor bursa, dedupe hash konten, resume per chunk, dan alasan penolakan."""
+import pandas as pd
+import pytest
+import database
+import transaction_import
+from transaction_import import import_transactions, normalize_chunk, resolve_columns
+
+BINANCE_HEADER = "Date(UTC),OrderNo,Pair,Type,Side,Order Price,Order Amount,Time,Executed,Average Price,Trading total,Status"
+
+@pytest.fixture
+def ledger(tmp_path, monkeypatch):
+    monkeypatch.setenv("TURSO_DATABASE_URL", f"file:{tmp_path / 'ledger.db'}")
+    monkeypatch.setattr(database, "REPLICA_PATH", "")
+    database.close_client(); database.init_db()
+    yield
+    database.close_client()
+
+def _write(path, lines):
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+def _ledger():
+    with database.connection() as conn:
+        return [tuple(r) for r in conn.execute("SELECT timestamp, asset, type, quantity, price FROM transactions ORDER BY timestamp, id").rows]
+
+def _trades(n):
+    # Baris 2 dan 3 identik (partial fill pada detik yang sama) dan tetap harus jadi dua transaksi
+    rows = ["2024-01-01 00:00:00,BTCUSDT,BUY,0.5,40000"] * 3 + [f"2024-01-{d:02d} 00:00:00,ETHUSDT,SELL,{d},2000" for d in range(2, n - 1)]
+    return ["time,symbol,side,qty,price"] + rows
+
+def test_binance_side_column_wins_over_order_type(ledger, tmp_path):
+    assert resolve_columns(BINANCE_HEADER.split(","))["Side"] == "type"
+    path = _write(tmp_path / "binance.csv", [BINANCE_HEADER,
+        "2024-03-01 10:00:00,123,BTCUSDT,LIMIT,BUY,60000,0.1BTC,2024-03-01 10:00:00,0.1BTC,60000,6000USDT,FILLED",
+        "2024-03-02 10:00:00,124,ETHUSDT,MARKET,SELL,0,1ETH,2024-03-02 10:00:00,1ETH,3500,3500USDT,FILLED"])
+    stats = import_transactions(path, sync_prices=False)
+    assert (stats["inserted"], stats["rejected"]) == (2, 0)
+    assert _ledger() == [("2024-03-01 10:00:00", "BTC", "BUY", 0.1, 60000.0), ("2024-03-02 10:00:00", "ETH", "SELL", 1.0, 3500.0)]
+
+def test_reimport_adds_no_rows(ledger, tmp_path):
+    path = _write(tmp_path / "trades.csv", _trades(10))
+    assert import_transactions(path, sync_prices=False)["inserted"] == 10
+    assert import_transactions(path, sync_prices=False)["inserted"] == 0
+    again = import_transactions(path, sync_prices=False, restart=True)
+    assert (again["inserted"], again["duplicates"]) == (0, 10)
+    # Isi sama di file lain (job berbeda, tanpa checkpoint): hash konten yang mencegah baris ganda
+    copy = _write(tmp_path / "copy.csv", _trades(10) + [""])
+    assert import_transactions(copy, sync_prices=False)["inserted"] == 0
+    assert len(_ledger()) == 10 and database.rebuild_holdings(fix=False) == []
+
+def test_resume_after_failed_chunk(ledger, tmp_path, monkeypatch):
+    path = _write(tmp_path / "trades.csv", _trades(10))
+    write_chunk, calls = transaction_import.import_transactions_chunk, []
+    def flaky(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 3: raise ConnectionError("putus")
+        return write_chunk(*args, **kwargs)
+    monkeypatch.setattr(transaction_import, "import_transactions_chunk", flaky)
+    with pytest.raises(ConnectionError): import_transactions(path, chunk_size=2, sync_prices=False)
+    assert len(_ledger()) == 4 and database.rebuild_holdings(fix=False) == []  # holdings dibangun ulang walau gagal
+    # Ukuran chunk berbeda: checkpoint (baris 4) jatuh di tengah chunk pertama run kedua
+    stats = import_transactions(path, chunk_size=3, sync_prices=False)
+    assert (stats["resumed_from"], stats["inserted"], stats["duplicates"]) == (4, 6, 0)
+    assert _ledger()[:3] == [("2024-01-01 00:00:00", "BTC", "BUY", 0.5, 40000.0)] * 3
+    assert len(_ledger()) == 10 and database.rebuild_holdings(fix=False) == []
+
+def test_rejected_row_reasons(ledger, tmp_path):
+    path = _write(tmp_path / "bad.csv", ["time,asset,type,qty,price",
+        "2024-01-01,BTC,BUY,1,30000",
+        "2024-01-02,BTC,BUY,1,abc",
+        "2024-01-03,BTC,BUY,0,30000",
+        "2024-01-04,BTC,TRANSFER,1,30000",
+        "2024-01-05,,BUY,1,30000",
+        "bukan tanggal,BTC,BUY,1,30000",
+        "2024-01-07,USDT,DEPOSIT,100,"])
+    stats = import_transactions(path, sync_prices=False)
+    assert (stats["inserted"], stats["rejected"]) == (2, 5)
+    assert stats["rejected_reasons"] == {"harga tidak valid": 1, "jumlah tidak valid": 1, "tipe tidak dikenal": 1, "aset kosong": 1, "waktu tidak valid": 1}
+    assert [s["row"] for s in stats["rejected_samples"]] == [2, 3, 4, 5, 6]
+
+def test_manual_map_overrides_aliases():
+    mapping = resolve_columns(["Date", "Pair", "Side", "Amount", "Price", "Type"], {"Type": "type"})
+    assert mapping["Type"] == "type" and "Side" not in mapping
+    raw = pd.DataFrame({"Date": ["2024-01-01"], "Pair": ["BTCUSDT"], "Side": ["LIMIT"], "Amount": ["1"], "Price": ["1"], "Type": ["BUY"]})
+    df, reason = normalize_chunk(raw, mapping)
+    assert df["type"].tolist() == ["BUY"] and reason.isna().all()
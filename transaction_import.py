@@ -0,0 +1,266 @@
+"""Impor massal transaksi dari ekspor bursa (CSV, JSON Lines, atau array JSON).
+
+Jalankan: python transaction_import.py ekspor.csv [--currency IDR] [--map "Date(UTC)=timestamp"] [--offline] [--restart]
+
+File dibaca per chunk (memori tetap terbatas untuk jutaan baris), divalidasi, dikonversi ke USD dengan kurs harian,
+lalu ditulis dengan INSERT multi-baris dalam satu batch per chunk bersama checkpoint job. Impor yang gagal di tengah
+jalan dilanjutkan dari chunk terakhir yang tersimpan saat file yang sama diimpor lagi, dan baris yang sudah ada
+(hash konten sama) dilewati sehingga impor ulang aman.
+"""
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+import perf
+from database import start_import_job, import_transactions_chunk, finish_import_job, rebuild_holdings, close_client
+
+CHUNK_SIZE = 5000
+FX_PREFETCH_DAYS = 90
+STABLE_QUOTES = {"USD", "USDT", "USDC", "BUSD", "FDUSD", "DAI", "TUSD"}
+FIAT_CURRENCIES = {"IDR", "EUR", "GBP", "JPY", "SGD", "AUD", "CAD", "CHF", "KRW", "CNY", "HKD", "INR", "MYR", "THB", "PHP", "VND", "TRY", "BRL"}
+# Akhiran pair yang dikenali saat aset & quote tergabung (mis. BTCUSDT, ETH/IDR)
+KNOWN_QUOTES = sorted(STABLE_QUOTES | FIAT_CURRENCIES | {"BTC", "ETH", "BNB"}, key=len, reverse=True)
+
+# Nama kolom ekspor (huruf kecil, tanpa simbol) -> kolom kanonik; jika beberapa kolom cocok, alias yang lebih depan menang
+COLUMN_ALIASES = {
+    "timestamp": ["timestamp", "date", "dateutc", "time", "datetime", "createdat", "tradetime", "waktu", "tanggal"],
+    "asset": ["asset", "coin", "base", "baseasset", "aset", "koin"],
+    "pair": ["pair", "market", "symbol", "instrument", "pasangan"],
+    "type": ["side", "type", "direction", "operation", "tipe"],  # Binance: Side = BUY/SELL, Type = LIMIT/MARKET
+    "quantity": ["quantity", "amount", "executed", "executedqty", "filled", "qty", "size", "jumlah"],
+    "price": ["price", "avgprice", "averageprice", "fillprice", "harga"],
+    "currency": ["quote", "quoteasset", "quotecurrency", "pricecurrency"],
+    "external_id": ["tradeid", "orderid", "orderno", "txid", "transactionid", "id"],
+}
+TYPE_ALIASES = {"BUY": "BUY", "BELI": "BUY", "SELL": "SELL", "JUAL": "SELL", "DEPOSIT": "DEPOSIT", "SETOR": "DEPOSIT"}
+_NUMBER = re.compile(r"^\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)")
+
+# --- PEMBACAAN & NORMALISASI ---
+def job_key(f):
+    """Identitas file untuk resume: ukuran + hash 1 MB pertama dan 64 KB terakhir (tanpa membaca seluruh file)."""
+    f.seek(0, os.SEEK_END); size = f.tell()
+    digest = hashlib.sha256(str(size).encode())
+    f.seek(0); digest.update(f.read(1 << 20))
+    f.seek(max(0, size - (1 << 16))); digest.update(f.read())
+    f.seek(0)
+    return digest.hexdigest(), size
+
+def detect_format(f, name=""):
+    name = name.lower()
+    if name.endswith((".jsonl", ".ndjson")): return "jsonl"
+    first = f.read(4096).lstrip()[:1]; f.seek(0)
+    if first == b"[": return "json"
+    if first == b"{" or name.endswith(".json"): return "jsonl"
+    return "csv"
+
+def read_chunks(f, fmt, chunk_size=CHUNK_SIZE):
+    if fmt == "csv": return pd.read_csv(f, chunksize=chunk_size, dtype=str, skipinitialspace=True, keep_default_na=False)
+    if fmt == "jsonl": return pd.read_json(f, lines=True, chunksize=chunk_size, dtype=False)
+    # Array JSON tidak bisa di-stream tanpa parser inkremental: dimuat utuh, baru diproses per chunk
+    data = pd.DataFrame(json.load(f))
+    return (data.iloc[i:i + chunk_size] for i in range(0, len(data), chunk_size))
+
+def resolve_columns(columns, column_map=None):
+    """Petakan kolom ekspor ke kolom kanonik menurut prioritas alias (bukan urutan kolom di file);
+    `column_map` ({kolom_ekspor: kanonik}) menang atas alias bawaan."""
+    keys = [re.sub(r"[^a-z0-9]", "", str(col).lower()) for col in columns]
+    mapping = {}
+    for canonical, aliases in COLUMN_ALIASES.items():
+        candidates = [(aliases.index(key), i) for i, key in enumerate(keys) if key in aliases]
+        if candidates: mapping[columns[min(candidates)[1]]] = canonical
+    for col, canonical in (column_map or {}).items():
+        mapping = {k: v for k, v in mapping.items() if v != canonical}; mapping[col] = canonical
+    found = set(mapping.values())
+    missing = [c for c in ("timestamp", "type", "quantity") if c not in found]
+    if "asset" not in found and "pair" not in found: missing.append("asset/pair")
+    if missing: raise ValueError(f"Kolom wajib tidak ditemukan: {', '.join(missing)} (kolom file: {', '.join(map(str, columns))})")
+    return mapping
+
+def _split_pairs(pairs):
+    """'BTCUSDT' / 'BTC/USDT' / 'btc_idr' -> (aset, quote); quote NaN bila tidak dikenali."""
+    pairs = pairs.str.upper().str.strip()
+    separated = pairs.str.extract(r"^([A-Z0-9]+)[/\-_:]([A-Z0-9]+)$")
+    suffixed = pairs.str.extract(f"^([A-Z0-9]+?)({'|'.join(KNOWN_QUOTES)})$")
+    return separated[0].fillna(suffixed[0]).fillna(pairs), separated[1].fillna(suffixed[1])
+
+def _numbers(series):
+    if pd.api.types.is_numeric_dtype(series): return series.astype(float)
+    return pd.to_numeric(series.astype(str).str.replace(",", "", regex=False).str.extract(_NUMBER, expand=False), errors="coerce")
+
+def _timestamps(series):
+    """Teks tanggal (format apa pun yang dikenali pandas) atau epoch detik/milidetik -> datetime UTC; NaT jika tidak valid."""
+    numeric = _numbers(series) if not pd.api.types.is_numeric_dtype(series) else series.astype(float)
+    if series.astype(str).str.fullmatch(r"\s*\d{9,13}(\.\d+)?\s*").all():
+        return pd.to_datetime(numeric, unit="ms" if numeric.max() > 1e11 else "s", utc=True, errors="coerce")
+    try:
+        return pd.to_datetime(series, utc=True)
+    except (ValueError, TypeError):
+        return pd.to_datetime(series, utc=True, errors="coerce", format="mixed")
+
+def normalize_chunk(raw, mapping, default_currency="USD"):
+    """Chunk mentah -> DataFrame kanonik (timestamp, asset, type, quantity, price, currency, external_id) + Series alasan penolakan."""
+    df = raw[list(mapping)].rename(columns=mapping)  # kolom kandidat yang kalah (mis. Type) tidak ikut agar nama tidak ganda
+    out = pd.DataFrame(index=raw.index)
+    ts = _timestamps(df["timestamp"])
+    out["timestamp"] = ts.dt.tz_localize(None).dt.strftime("%Y-%m-%d %H:%M:%S")
+    if "asset" in df: asset, quote = df["asset"].astype(str).str.upper().str.strip(), None
+    else: asset, quote = _split_pairs(df["pair"].astype(str))
+    if "currency" in df: quote = df["currency"].astype(str).str.upper().str.strip().replace("", np.nan)
+    out["asset"] = asset
+    out["currency"] = (quote if quote is not None else pd.Series(np.nan, index=raw.index)).fillna(default_currency.upper())
+    out["type"] = df["type"].astype(str).str.upper().str.strip().map(TYPE_ALIASES)
+    out["quantity"] = _numbers(df["quantity"]).abs()
+    out["price"] = _numbers(df["price"]) if "price" in df else np.nan
+    out.loc[(out["type"] == "DEPOSIT") & out["price"].isna(), "price"] = 1.0  # harga tidak dipakai untuk setoran
+    out["external_id"] = df["external_id"].astype(str) if "external_id" in df else ""
+    reason = pd.Series(None, index=raw.index, dtype=object)
+    for mask, why in [
+        (out["price"].isna() | (out["price"] < 0), "harga tidak valid"),
+        (out["quantity"].isna() | (out["quantity"] <= 0), "jumlah tidak valid"),
+        (out["type"].isna(), "tipe tidak dikenal"),
+        (out["asset"].isna() | (out["asset"].isin(["", "NAN", "NONE"])), "aset kosong"),
+        (ts.isna(), "waktu tidak valid"),
+    ]:
+        reason = reason.mask(mask, why)
+    return out, reason
+
+def content_hashes(df, carry):
+    """Hash konten per baris. Baris identik (mis. partial fill pada detik yang sama) dibedakan dengan nomor kemunculannya,
+    dan hitungan untuk timestamp baris terakhir dibawa ke chunk berikutnya lewat `carry` agar tetap deterministik."""
+    if df.empty: return [], carry
+    base = (df["timestamp"] + "|" + df["asset"] + "|" + df["type"] + "|" + df["quantity"].map(repr) + "|" + df["price"].map(repr)
+            + "|" + df["currency"] + "|" + df["external_id"].astype(str))
+    occurrence = base.groupby(base).cumcount() + base.map(carry).fillna(0).astype(int)
+    boundary = base[df["timestamp"] == df["timestamp"].iloc[-1]]
+    new_carry = {b: int(n) for b, n in (occurrence[boundary.index].groupby(boundary).max() + 1).items()}
+    hashes = [hashlib.sha256(f"{b}#{n}".encode()).hexdigest() for b, n in zip(base, occurrence)]
+    return hashes, new_carry
+
+# --- KURS KE USD (cache per mata uang & hari) ---
+class FxRates:
+    """Pengali ke USD per (kode, hari): stablecoin = 1, fiat = 1 / close '<KODE>=X', kripto = close '<KODE>-USD'.
+
+    Data harian diambil dari ohlcv_store (diunduh hanya untuk rentang yang belum ada) lalu disimpan di memori,
+    sehingga satu file jutaan baris hanya butuh beberapa pembacaan per mata uang.
+    """
+
+    def __init__(self, sync_prices=True):
+        self.sync_prices, self._rates, self.lookups = sync_prices, {}, 0
+
+    @staticmethod
+    def symbol(code):
+        return f"{code}=X" if code in FIAT_CURRENCIES else f"{code}-USD"
+
+    def _load(self, code, days):
+        from ohlcv_store import get_close_matrix
+        self.lookups += 1
+        symbol = self.symbol(code)
+        # Ambil sekalian beberapa bulan ke depan: ekspor biasanya urut waktu, jadi chunk berikutnya langsung kena cache
+        end = max(max(days), min(min(days) + timedelta(days=FX_PREFETCH_DAYS), date.today()))
+        with perf.span("import.fx_lookup", currency=code, days=len(days)):
+            closes = get_close_matrix([symbol], min(days), end, sync_first=self.sync_prices)[symbol]
+        values = 1 / closes if code in FIAT_CURRENCIES else closes
+        for day, value in values.items(): self._rates[(code, day.date())] = float(value) if value == value and value > 0 else np.nan
+
+    def multipliers(self, codes, days):
+        """Series pengali ke USD untuk pasangan (kode, tanggal) per baris; NaN jika kurs tidak tersedia."""
+        codes = codes.astype(str)
+        result = pd.Series(np.nan, index=codes.index)
+        stable = codes.isin(STABLE_QUOTES)
+        result[stable] = 1.0
+        pending = pd.DataFrame({"code": codes[~stable], "day": days[~stable]}).dropna()
+        for code, group in pending.groupby("code"):
+            missing = sorted({d for d in group["day"] if (code, d) not in self._rates})
+            if missing: self._load(code, missing)
+            result[group.index] = [self._rates.get((code, d), np.nan) for d in group["day"]]
+        return result
+
+# --- PIPELINE ---
+def import_transactions(source, currency="USD", chunk_size=CHUNK_SIZE, column_map=None, sync_prices=True, restart=False, progress=None, max_samples=20):
+    """Impor file (path atau file biner yang bisa di-seek) ke tabel transactions; mengembalikan statistik impor.
+
+    `currency` adalah mata uang harga bila file tidak punya kolom quote/pair. DEPOSIT disimpan sebagai nilai USD
+    (quantity) dengan harga 1.0, sama seperti setoran manual. Setelah selesai (atau gagal setelah ada baris masuk),
+    holdings dibangun ulang dari ledger supaya tetap konsisten.
+    """
+    own_file = isinstance(source, (str, os.PathLike))
+    f = open(source, "rb") if own_file else source
+    name = str(source) if own_file else getattr(source, "name", "upload")
+    stats = {"source": os.path.basename(name), "rows_read": 0, "inserted": 0, "duplicates": 0, "rejected": 0, "resumed_from": 0,
+             "rejected_reasons": {}, "rejected_samples": [], "fx_lookups": 0, "elapsed_s": 0.0, "rows_per_s": 0.0, "progress": 0.0}
+    fx, t0, status, key = FxRates(sync_prices), time.perf_counter(), "failed", None
+    try:
+        key, size = job_key(f)
+        rows_done, state = start_import_job(key, stats["source"], restart)
+        stats["resumed_from"] = rows_done
+        carry = json.loads(state) if state else {}
+        fmt, mapping = detect_format(f, name), None
+        for raw in read_chunks(f, fmt, chunk_size):
+            start_row = stats["rows_read"]
+            stats["rows_read"] += len(raw)
+            if stats["rows_read"] <= rows_done: continue  # sudah tersimpan pada run sebelumnya
+            if start_row < rows_done: raw = raw.iloc[rows_done - start_row:]
+            with perf.span("import.chunk", rows=len(raw)):
+                mapping = mapping or resolve_columns(raw.columns, column_map)
+                df, reason = normalize_chunk(raw, mapping, currency)
+                valid = df[reason.isna()]
+                days = pd.to_datetime(valid["timestamp"]).dt.date
+                is_deposit = valid["type"] == "DEPOSIT"
+                # Harga BUY/SELL dalam mata uang quote; nilai DEPOSIT dalam mata uang aset yang disetor
+                mult = fx.multipliers(valid["currency"].where(~is_deposit, valid["asset"]), days)
+                no_rate = mult.isna()
+                reason[no_rate[no_rate].index] = "kurs tidak tersedia"
+                valid, mult, is_deposit = valid[~no_rate], mult[~no_rate], is_deposit[~no_rate]
+                hashes, carry = content_hashes(valid, carry)
+                quantity = np.where(is_deposit, valid["quantity"] * mult, valid["quantity"])
+                price = np.where(is_deposit, 1.0, valid["price"] * mult)
+                asset = valid["asset"].where(~is_deposit | valid["asset"].isin(STABLE_QUOTES), "USD")
+                rows = list(zip(valid["timestamp"], asset, valid["type"], quantity.tolist(), price.tolist(), hashes))
+                inserted = import_transactions_chunk(key, rows, stats["rows_read"], json.dumps(carry))
+            rejected = reason.dropna()
+            stats["inserted"] += inserted; stats["duplicates"] += len(rows) - inserted; stats["rejected"] += len(rejected)
+            for why, n in rejected.value_counts().items(): stats["rejected_reasons"][why] = stats["rejected_reasons"].get(why, 0) + int(n)
+            room = max_samples - len(stats["rejected_samples"])
+            if room > 0: stats["rejected_samples"] += [{"row": int(i) + 1, "reason": why} for i, why in rejected.iloc[:room].items()]
+            elapsed = time.perf_counter() - t0
+            stats.update(elapsed_s=elapsed, rows_per_s=(stats["rows_read"] - rows_done) / elapsed if elapsed else 0.0,
+                         progress=min(1.0, f.tell() / size) if size else 1.0, fx_lookups=fx.lookups)
+            if progress: progress(dict(stats))
+        status = "done"
+    finally:
+        stats.update(elapsed_s=time.perf_counter() - t0, progress=1.0 if status == "done" else stats["progress"])
+        try:
+            if stats["inserted"]: rebuild_holdings(fix=True)
+            if key: finish_import_job(key, status, json.dumps({k: v for k, v in stats.items() if k != "rejected_samples"}))
+        finally:
+            if own_file: f.close()
+    return stats
+
+def _print_progress(stats):
+    print(f"\r{stats['progress']:6.1%}  {stats['rows_read']:>10,} baris  +{stats['inserted']:,} baru  {stats['duplicates']:,} duplikat  "
+          f"{stats['rejected']:,} ditolak  {stats['rows_per_s']:,.0f} baris/s", end="", flush=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--currency", default="USD", help="mata uang harga jika file tidak punya kolom quote/pair")
+    parser.add_argument("--map", nargs="*", default=[], metavar="KOLOM=KANONIK", help=f"pemetaan kolom manual; kanonik: {', '.join(COLUMN_ALIASES)}")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--offline", action="store_true", help="pakai kurs yang sudah ada di cache lokal saja")
+    parser.add_argument("--restart", action="store_true", help="abaikan checkpoint dan proses file dari awal (duplikat tetap dilewati)")
+    args = parser.parse_args()
+    column_map = dict(m.split("=", 1) for m in args.map)
+    try:
+        result = import_transactions(args.path, args.currency, args.chunk_size, column_map, sync_prices=not args.offline, restart=args.restart, progress=_print_progress)
+    except ValueError as e:
+        print(f"Gagal: {e}"); close_client(); sys.exit(1)
+    print(f"\nSelesai dalam {result['elapsed_s']:.1f} s" + (f" (dilanjutkan dari baris {result['resumed_from']:,})" if result["resumed_from"] else "") + ".")
+    for why, n in result["rejected_reasons"].items(): print(f"  ditolak ({why}): {n:,}")
+    for s in result["rejected_samples"][:5]: print(f"    baris {s['row']}: {s['reason']}")
+    close_client()
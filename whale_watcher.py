@@ -1,44 +1,178 @@
 import os
+import time
+import asyncio
+import threading
+import aiohttp
 import requests
+import numpy as np
 import pandas as pd
+from decimal import Decimal
 from dotenv import load_dotenv
 from datetime import datetime
+from database import get_watched_wallets, get_wallet_cursors, save_whale_transfers, get_whale_transfers
+import perf
 
 load_dotenv()
 ETHERSCAN_API_KEY = os.getenv("ETHERSCAN_API_KEY")
+ETHERSCAN_API_URL = os.getenv("ETHERSCAN_API_URL", "https://api.etherscan.io/api")
+# Batas free tier Etherscan: 5 request per detik
+ETHERSCAN_RATE_LIMIT = float(os.getenv("ETHERSCAN_RATE_LIMIT", "5"))
+ETHERSCAN_PAGE_SIZE = 1000
+# Etherscan menolak page * offset > 10000; setelah itu query diulang dari blok terakhir
+ETHERSCAN_RESULT_WINDOW = 10000
+
+# Tabel pangkat 10 negatif untuk bagian pecahan; 18 digit pecahan masih muat persis di int64
+_MAX_FAST_DECIMALS = 18
+_NEG_POW10 = np.array([10.0 ** -d for d in range(_MAX_FAST_DECIMALS + 1)])
+
+def _scale_raw_values(raw, decimals, exact=False):
+    """Membagi nilai integer mentah (string) dengan 10**decimals tanpa aritmetika float pada angka besar.
+
+    Per kelompok `tokenDecimal`, string dipotong menjadi bagian bulat dan pecahan dengan operasi kolom.
+    exact=True mengembalikan Decimal yang persis; selain itu float hasil satu kali pembulatan.
+    """
+    raw = raw.fillna("0").astype(str).str.strip().where(lambda s: s.str.fullmatch(r"\d+"), "0")
+    out = pd.Series(np.zeros(len(raw)) if not exact else [Decimal(0)] * len(raw), index=raw.index, dtype=float if not exact else object)
+    for d in np.unique(decimals):
+        mask = decimals == d
+        digits = raw[mask]
+        if d <= 0:
+            out[mask] = digits.map(Decimal) if exact else pd.to_numeric(digits).astype(float); continue
+        padded = digits.str.zfill(d + 1)
+        whole, frac = padded.str[:-d], padded.str[-d:]
+        if exact:
+            out[mask] = (whole + "." + frac).map(Decimal)
+        elif d <= _MAX_FAST_DECIMALS:
+            out[mask] = pd.to_numeric(whole).astype(float) + pd.to_numeric(frac).astype(np.int64) * _NEG_POW10[d]
+        else:
+            out[mask] = (whole + "." + frac).map(Decimal).astype(float)
+    return out
+
+def normalize_token_transfers(df, wallet_address, exact=False):
+    """Normalisasi hasil `tokentx` Etherscan secara vektor: skala nilai, waktu, dan arah (MASUK/KELUAR)."""
+    decimals = pd.to_numeric(df['tokenDecimal'], errors='coerce').fillna(18).astype(int).to_numpy()
+    df = df.assign(
+        value=_scale_raw_values(df['value'], decimals, exact),
+        timeStamp=pd.to_datetime(pd.to_numeric(df['timeStamp']), unit='s'),
+        Arah=np.where(df['from'].str.lower().to_numpy() == wallet_address.lower(), 'KELUAR', 'MASUK'),
+    )
+    df_clean = df[['timeStamp', 'Arah', 'tokenSymbol', 'value', 'to', 'from']]
+    df_clean.columns = ['Waktu', 'Arah', 'Aset', 'Jumlah', 'Ke', 'Dari']
+    return df_clean
 
 def get_latest_transactions(wallet_address, limit=25):
     """Mengambil transaksi token ERC-20 terakhir dari sebuah alamat wallet."""
     if not ETHERSCAN_API_KEY:
         return "Error: Kunci API Etherscan tidak ditemukan di file .env"
 
-    api_url = f"https://api.etherscan.io/api?module=account&action=tokentx&address={wallet_address}&page=1&offset={limit}&sort=desc&apikey={ETHERSCAN_API_KEY}"
+    api_url = f"{ETHERSCAN_API_URL}?module=account&action=tokentx&address={wallet_address}&page=1&offset={limit}&sort=desc&apikey={ETHERSCAN_API_KEY}"
     
     try:
-        response = requests.get(api_url)
-        response.raise_for_status()
+        with perf.span("etherscan.tokentx", limit=limit):
+            response = requests.get(api_url)
+            response.raise_for_status()
         data = response.json()
 
         if data['status'] == '1' and data['result']:
-            df = pd.DataFrame(data['result'])
-            
-            
-            df['value'] = pd.to_numeric(df['value'], errors='coerce').fillna(0)
-            df['tokenDecimal'] = pd.to_numeric(df['tokenDecimal'], errors='coerce').fillna(18).astype(int)
-
-            
-            df['value'] = df.apply(
-                lambda row: row['value'] / (10**row['tokenDecimal']) if row['tokenDecimal'] > 0 else row['value'],
-                axis=1
-            )
-            
-            df['timeStamp'] = pd.to_datetime(df['timeStamp'], unit='s')
-            df['Arah'] = df.apply(lambda row: 'KELUAR' if row['from'].lower() == wallet_address.lower() else 'MASUK', axis=1)
-            
-            df_clean = df[['timeStamp', 'Arah', 'tokenSymbol', 'value', 'to', 'from']]
-            df_clean.columns = ['Waktu', 'Arah', 'Aset', 'Jumlah', 'Ke', 'Dari']
-            return df_clean
+            return normalize_token_transfers(pd.DataFrame(data['result']), wallet_address)
         else:
             return pd.DataFrame() 
     except Exception as e:
-        return f"Error saat menghubungi Etherscan: {e}"
\ No newline at end of file
+        return f"Error saat menghubungi Etherscan: {e}"
+
+# --- SINKRONISASI MULTI-WALLET (asyncio + token bucket + cursor startblock) ---
+class TokenBucket:
+    """Rate limiter token bucket untuk coroutine: `rate` token per detik, maksimal `capacity` burst."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate, self.capacity = rate, capacity or max(1.0, rate)
+        self._tokens, self._updated = self.capacity, time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+async def _fetch_page(session, bucket, wallet_address, start_block, page, retries=3):
+    params = {"module": "account", "action": "tokentx", "address": wallet_address, "startblock": start_block, "endblock": 99999999,
+              "page": page, "offset": ETHERSCAN_PAGE_SIZE, "sort": "asc", "apikey": ETHERSCAN_API_KEY or ""}
+    for attempt in range(retries + 1):
+        await bucket.acquire()
+        with perf.span("etherscan.tokentx", page=page, attempt=attempt):
+            async with session.get(ETHERSCAN_API_URL, params=params) as response:
+                response.raise_for_status()
+                data = await response.json(content_type=None)
+        if data.get("status") == "1": return data["result"]
+        result = data.get("result")
+        if isinstance(result, str) and "rate limit" in result.lower() and attempt < retries:
+            await asyncio.sleep(1 + attempt); continue
+        if "no transactions found" in str(data.get("message", "")).lower(): return []
+        raise RuntimeError(f"Etherscan: {data.get('message')} - {result}")
+    return []
+
+def _transfer_row(tx):
+    return (int(tx["blockNumber"]), int(tx["timeStamp"]), tx["hash"], tx.get("contractAddress", "").lower(), tx["from"].lower(), tx["to"].lower(),
+            tx["value"], tx.get("tokenSymbol"), tx.get("tokenDecimal"))
+
+async def sync_wallet(session, bucket, wallet_address, start_block=0):
+    """Ambil semua transfer sejak `start_block` (inklusif, duplikat diabaikan DB) dan simpan per halaman."""
+    saved = 0
+    while True:
+        last_block, window_full = start_block, False
+        for page in range(1, ETHERSCAN_RESULT_WINDOW // ETHERSCAN_PAGE_SIZE + 1):
+            result = await _fetch_page(session, bucket, wallet_address, start_block, page)
+            if result:
+                rows = [_transfer_row(tx) for tx in result]
+                last_block = max(last_block, rows[-1][0])
+                await asyncio.to_thread(save_whale_transfers, wallet_address, rows, last_block)
+                saved += len(rows)
+            if len(result) < ETHERSCAN_PAGE_SIZE: break
+        else:
+            window_full = True
+        if not window_full:
+            if saved == 0: await asyncio.to_thread(save_whale_transfers, wallet_address, [], start_block)
+            return saved
+        if last_block == start_block:
+            raise RuntimeError(f"Lebih dari {ETHERSCAN_RESULT_WINDOW} transfer di blok {start_block}, tidak bisa dipaginasi.")
+        start_block = last_block
+
+async def sync_all_wallets(addresses=None, rate=None, max_concurrency=8):
+    """Sinkronkan semua wallet di daftar pantau secara konkuren; kembalikan {alamat: jumlah transfer yang diambil atau pesan error}."""
+    if addresses is None: addresses = (await asyncio.to_thread(get_watched_wallets))['address'].tolist()
+    cursors = await asyncio.to_thread(get_wallet_cursors)
+    bucket, semaphore = TokenBucket(rate or ETHERSCAN_RATE_LIMIT), asyncio.Semaphore(max_concurrency)
+    timeout = aiohttp.ClientTimeout(total=60)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        async def run(address):
+            async with semaphore:
+                try: return address, await sync_wallet(session, bucket, address, cursors.get(address.lower(), 0))
+                except Exception as e: return address, f"Error: {e}"
+        return dict(await asyncio.gather(*(run(a) for a in addresses)))
+
+_sync_thread = None
+_last_sync_started = 0.0
+
+def start_background_sync(min_interval=300):
+    """Jalankan sync_all_wallets di thread background (tidak memblokir UI) jika sinkronisasi terakhir sudah lewat `min_interval` detik."""
+    global _sync_thread, _last_sync_started
+    if not ETHERSCAN_API_KEY: return False
+    if (_sync_thread and _sync_thread.is_alive()) or time.monotonic() - _last_sync_started < min_interval: return False
+    _last_sync_started = time.monotonic()
+    _sync_thread = threading.Thread(target=lambda: asyncio.run(sync_all_wallets()), name="whale_sync", daemon=True)
+    _sync_thread.start()
+    return True
+
+def is_sync_running():
+    return bool(_sync_thread and _sync_thread.is_alive())
+
+def get_stored_transactions(wallet_address, limit=25):
+    """Transfer terbaru dari database lokal (hasil sinkronisasi), sudah dinormalisasi."""
+    df = get_whale_transfers(wallet_address, limit)
+    return normalize_token_transfers(df, wallet_address) if not df.empty else pd.DataFrame()